@@ -1,6 +1,121 @@
 from abc import ABC
 
+import pygame
+
+from utils.timestep import FixedTimestep, InterpolatedSprite
+
 
 class BaseScene(ABC):
-    def render(self, clock, screen, events, keys):
+    # scenes draw onto a surface this many times smaller than the screen,
+    # which is upscaled once per frame (see utils.render.Framebuffer)
+    pixel_scale = 1
+    # the HUD is drawn onto a layer this many times smaller than the screen,
+    # upscaled over the world, None means the scene draws no HUD
+    hud_scale = None
+    # sprites that would lose detail at pixel_scale, such as rotated ones, are
+    # drawn onto a layer this many times smaller than the screen, between the
+    # world and the HUD, None means the scene draws none
+    sprite_scale = None
+    # rects drawn during the last render, None means the whole frame changed,
+    # on the world, the sprite and the HUD layer
+    dirty_rects = None
+    sprite_rects = None
+    hud_rects = None
+    # frame rate targets for utils.scheduler.FrameScheduler, a scene without
+    # an idle_fps is never throttled when no input arrives
+    fps = 60
+    idle_fps = None
+    # most surfaces a steady state frame may allocate in benchmark.py, None
+    # means unchecked (see utils.allocations.SurfaceAllocations)
+    surface_budget = None
+    # asset files (relative to the assets folder) decoded by
+    # utils.assets.AssetLoader before the scene is constructed
+    assets = ()
+    # fixed simulation step in ms, scenes with one implement `update` and
+    # `draw` instead of `render` (see utils.timestep.FixedTimestep)
+    step_ms = None
+    timestep = None
+    # simulated ms, advanced by step_ms on every fixed step. Cooldowns,
+    # animations and tweens run on it rather than on the clock, so they stay
+    # in step with movement however many steps a frame runs or drops; the
+    # clock only decides each frame's dt (see utils.clock)
+    time = 0.0
+    # cooldowns and animation deadlines, run before every step (see
+    # utils.timers.TimerQueue), scenes using timers create one
+    timers = None
+    # frame animations, updated before every step (see
+    # utils.animation.Animator), scenes playing animations create one
+    animator = None
+    # tweened values, advanced before every step (see utils.tween.Tweens),
+    # scenes tweening values create one
+    tweens = None
+
+    # lifecycle hooks called by utils.scene_registry.SceneManager
+    def enter(self):
+        """Called when the scene first becomes active"""
+
+    def suspend(self):
+        """Called when another scene becomes active, this one stays resident"""
+
+    def resume(self):
+        """Called when the scene becomes active again after `suspend`"""
+
+    def exit(self):
+        """Called before the scene is unloaded, after `suspend` if it was active.
+
+        Empties the scene's sprite groups, which reference their sprites and
+        are referenced back, so that the sprites and the spritesheets they
+        hold are freed as soon as the scene is dropped.
+        """
+        for value in vars(self).values():
+            if isinstance(value, pygame.sprite.AbstractGroup):
+                value.empty()
+        # pending callbacks and animations hold on to their sprites too
+        if self.timers is not None:
+            self.timers.clear()
+        if self.animator is not None:
+            self.animator.clear()
+        if self.tweens is not None:
+            self.tweens.clear()
+
+    def render(self, screen, dt, events, keys, hud=None, sprites=None):
+        """Runs the fixed steps due after `dt` ms, then draws the frame.
+
+        Events are handed to the first step run after they arrive, so none
+        are lost or handled twice when a frame runs no or several steps. The
+        scene's timers due by then fire, and its animations and tweens move
+        on, before each step.
+        """
+        if self.timestep is None:
+            self.timestep = FixedTimestep(self.step_ms)
+            self._events = []
+        self._events.extend(events)
+        for _ in range(self.timestep.advance(dt)):
+            self.snapshot()
+            self.time += self.step_ms
+            now = self.time
+            if self.timers is not None:
+                self.timers.run(now)
+            if self.animator is not None:
+                self.animator.update(now)
+            if self.tweens is not None:
+                self.tweens.update(now)
+            self.update(self.step_ms, self._events, keys)
+            self._events.clear()
+        return self.draw(screen, self.timestep.alpha, hud, sprites)
+
+    def snapshot(self):
+        """Remembers where sprites are before a step, to interpolate from"""
+        for value in vars(self).values():
+            if isinstance(value, pygame.sprite.AbstractGroup):
+                for sprite in value:
+                    if isinstance(sprite, InterpolatedSprite):
+                        sprite.snapshot()
+
+    def update(self, dt, events, keys):
+        """Advances the simulation by one fixed step of `dt` ms"""
+        raise NotImplementedError
+
+    def draw(self, screen, alpha, hud=None, sprites=None):
+        """Draws the scene `alpha` of the way from the last step to the next"""
         raise NotImplementedError
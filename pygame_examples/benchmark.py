@@ -0,0 +1,375 @@
+"""
+Headless benchmark of every scene.
+
+Runs each scene under the SDL dummy video and audio drivers for a fixed
+number of frames with scripted keyboard and mouse input, and prints frame
+time statistics, allocations and throughput as JSON:
+
+    cd pygame_examples && python benchmark.py --frames 600
+
+A scene allocating more surfaces in a frame than its `surface_budget` (see
+BaseScene, or `--surface-budget`) fails the run with a non-zero exit code,
+as does a scene that can't be opened by clicking it in the title menu.
+
+Frames are simulated with a fixed dt so runs are comparable, and are not
+paced, so the throughput is how many frames per second a scene could run at.
+Scenes run their cooldowns and animations on simulated time, advanced by
+their fixed steps, so these play out in game time however fast the frames
+run, and long soak tests take seconds (`--frames 216000` is an hour of
+play).
+Python allocations are measured with tracemalloc, and surface allocations
+per call site with utils.allocations, each in a separate pass so tracking
+does not skew the frame times. The surfaces, sounds and arrays each scene
+holds once the frames have run are reported under `memory`.
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+
+import pygame
+
+from common import SCREEN_HEIGHT, SCREEN_WIDTH, BASE_COLOR
+from mapping.title_menu_enum import TitleMenuEnum, SCENE_MODULES
+from utils.allocations import SurfaceAllocations, resident_memory
+from utils.render import Framebuffer
+from utils.scene_registry import SceneManager, SceneRegistry, scene_class
+from utils.telemetry import percentile
+
+
+class ScriptedKeys(set):
+    """Stands in for `pygame.key.get_pressed()`, holding the pressed keys"""
+
+    def __getitem__(self, key):
+        return key in self
+
+
+class ScriptedInput:
+    """Deterministic input exercising every scene's controls.
+
+    The keyboard walks in a square with both the arrow keys and WASD, taps
+    the gravity and interact keys, and the mouse circles the screen,
+    clicking every `click_every` frames.
+    """
+
+    def __init__(self, click_every=30):
+        self.click_every = click_every
+        self.frame = 0
+
+    def keys(self):
+        direction = (self.frame // 30) % 4
+        pressed = ScriptedKeys(
+            [
+                (pygame.K_RIGHT, pygame.K_d),
+                (pygame.K_DOWN, pygame.K_s),
+                (pygame.K_LEFT, pygame.K_a),
+                (pygame.K_UP, pygame.K_w),
+            ][direction]
+        )
+        if self.frame % 120 == 10:
+            pressed.add(pygame.K_g)
+        if self.frame % 45 == 20:
+            pressed.add(pygame.K_z)
+        return pressed
+
+    def events(self):
+        events = [pygame.MOUSEMOTION]
+        if self.frame % self.click_every == self.click_every - 1:
+            events.append(pygame.MOUSEBUTTONDOWN)
+        return events
+
+    def mouse_pos(self):
+        angle = self.frame / 60 * math.pi
+        return (
+            int(SCREEN_WIDTH / 2 + SCREEN_WIDTH / 3 * math.cos(angle)),
+            int(SCREEN_HEIGHT / 2 + SCREEN_HEIGHT / 3 * math.sin(angle)),
+        )
+
+    def advance(self):
+        self.frame += 1
+
+
+def scene_classes():
+    return {
+        key: scene_class(module, key.value) for key, module in SCENE_MODULES.items()
+    }
+
+
+def run_frames(scene, framebuffer, script, frames, dt, on_frame=None):
+    frame_times = []
+    for _ in range(frames):
+        keys, events = script.keys(), script.events()
+        start = time.perf_counter()
+        canvas = framebuffer.begin(
+            scene.pixel_scale, scene.hud_scale, scene.sprite_scale
+        )
+        scene.render(
+            canvas, dt, events, keys, hud=framebuffer.hud, sprites=framebuffer.sprites
+        )
+        framebuffer.present(scene.dirty_rects, scene.hud_rects, scene.sprite_rects)
+        frame_times.append((time.perf_counter() - start) * 1000)
+        if on_frame is not None:
+            on_frame()
+        script.advance()
+    return frame_times
+
+
+def trace_allocations(scene, framebuffer, script, frames, dt):
+    """Python heap growth within each frame, and what is still held after"""
+    frame_allocations = []
+
+    def record_allocation():
+        current, peak = tracemalloc.get_traced_memory()
+        frame_allocations.append(peak - frame_start[0])
+        tracemalloc.reset_peak()
+        frame_start[0] = current
+
+    tracemalloc.start()
+    frame_start = [tracemalloc.get_traced_memory()[0]]
+    retained_start = frame_start[0]
+    run_frames(scene, framebuffer, script, frames, dt, record_allocation)
+    retained = tracemalloc.get_traced_memory()[0] - retained_start
+    tracemalloc.stop()
+    return {
+        "frames": frames,
+        "peak_bytes_per_frame_mean": sum(frame_allocations) / frames,
+        "peak_bytes_per_frame_max": max(frame_allocations),
+        "retained_bytes": retained,
+    }
+
+
+def track_surfaces(scene, framebuffer, script, frames, dt):
+    """Surfaces and pixel bytes allocated per frame, and by which call site"""
+    with SurfaceAllocations() as allocations:
+        run_frames(scene, framebuffer, script, frames, dt, allocations.end_frame)
+    return allocations.report()
+
+
+def benchmark_scene(
+    scene_class, screen, frames, dt, seed, alloc_frames, surface_frames
+):
+    # scenes read the mouse directly, the dummy driver never moves it
+    script = ScriptedInput()
+    get_pos = pygame.mouse.get_pos
+    pygame.mouse.get_pos = script.mouse_pos
+    try:
+        return _benchmark_scene(
+            scene_class, screen, frames, dt, seed, alloc_frames, surface_frames, script
+        )
+    finally:
+        pygame.mouse.get_pos = get_pos
+
+
+def _benchmark_scene(
+    scene_class, screen, frames, dt, seed, alloc_frames, surface_frames, script
+):
+    random.seed(seed)
+    start = time.perf_counter()
+    scene = scene_class()
+    construct_ms = (time.perf_counter() - start) * 1000
+    scene.enter()
+
+    framebuffer = Framebuffer(screen, background=BASE_COLOR, dirty_rects=True)
+    frame_times = run_frames(scene, framebuffer, script, frames, dt)
+
+    # allocations are traced in their own pass, tracing slows every frame down
+    allocations = None
+    if alloc_frames:
+        allocations = trace_allocations(scene, framebuffer, script, alloc_frames, dt)
+    # after the frames above, so caches are warm and only steady state is seen
+    surfaces = None
+    if surface_frames:
+        surfaces = track_surfaces(scene, framebuffer, script, surface_frames, dt)
+    memory = resident_memory(scene)
+    scene.suspend()
+    scene.exit()
+
+    total_ms = sum(frame_times)
+    return {
+        "frames": frames,
+        "construct_ms": construct_ms,
+        "frame_ms": {
+            "mean": total_ms / frames,
+            "p50": percentile(frame_times, 50),
+            "p95": percentile(frame_times, 95),
+            "p99": percentile(frame_times, 99),
+            "max": max(frame_times),
+        },
+        "throughput_fps": frames / (total_ms / 1000) if total_ms else None,
+        # game time simulated over every pass
+        "simulated_ms": round(scene.time, 3),
+        "allocations": allocations,
+        "surfaces": surfaces,
+        "memory": memory,
+    }
+
+
+def check_menu_selection(screen):
+    """Clicks every entry of the title menu and opens the scene selected.
+
+    Goes the way `main.py` does, through a `SceneManager` and what
+    `TitleMenu.render` returns, rather than from the enum keys. Returns a
+    failure message per entry that didn't open its scene.
+    """
+    scenes = SceneManager(
+        SceneRegistry(SCENE_MODULES), pinned=[TitleMenuEnum.TitleMenu]
+    )
+    framebuffer = Framebuffer(screen, background=BASE_COLOR, dirty_rects=True)
+    get_pos = pygame.mouse.get_pos
+    failures = []
+    try:
+        menu = scenes.switch(TitleMenuEnum.TitleMenu)
+        for key, text in list(menu.text.items()):
+            name = TitleMenuEnum(key).value
+            position = tuple(x * menu.pixel_scale for x in text.rect.center)
+            pygame.mouse.get_pos = lambda: position
+            try:
+                scenes.switch(TitleMenuEnum.TitleMenu)
+                canvas = framebuffer.begin(
+                    menu.pixel_scale, menu.hud_scale, menu.sprite_scale
+                )
+                selected = menu.render(
+                    canvas,
+                    0,
+                    [pygame.MOUSEBUTTONDOWN],
+                    ScriptedKeys(),
+                    hud=framebuffer.hud,
+                    sprites=framebuffer.sprites,
+                )
+                scenes.registry.scene_class(selected)
+                scene = scenes.switch(selected)
+                canvas = framebuffer.begin(
+                    scene.pixel_scale, scene.hud_scale, scene.sprite_scale
+                )
+                scene.render(
+                    canvas,
+                    1000 / 60,
+                    [],
+                    ScriptedKeys(),
+                    hud=framebuffer.hud,
+                    sprites=framebuffer.sprites,
+                )
+                framebuffer.present(
+                    scene.dirty_rects, scene.hud_rects, scene.sprite_rects
+                )
+                if scenes.active is not TitleMenuEnum(name):
+                    failures.append(f"Clicking {name} opened {scenes.active!r}")
+            except Exception as e:
+                failures.append(f"Clicking {name} in the title menu raised {e!r}")
+    finally:
+        pygame.mouse.get_pos = get_pos
+        for key in scenes.registry.resident():
+            if key != scenes.active:
+                scenes.unload(key)
+    return failures
+
+
+def parse_budgets(values):
+    """`N` sets every scene's surface budget, `SCENE=N` a single scene's"""
+    budgets = {}
+    for value in values:
+        name, _, budget = value.rpartition("=")
+        scenes = [TitleMenuEnum(name)] if name else list(TitleMenuEnum)
+        for scene in scenes:
+            budgets[scene.value] = int(budget)
+    return budgets
+
+
+def over_budget(name, result, budget):
+    if budget is None or result["surfaces"] is None:
+        return None
+    allocated = result["surfaces"]["surfaces_per_frame_max"]
+    if allocated <= budget:
+        return None
+    return f"{name} allocated {allocated} surfaces in a frame, its budget is {budget}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument(
+        "--alloc-frames",
+        type=int,
+        default=120,
+        help="frames traced for allocations, 0 to skip",
+    )
+    parser.add_argument(
+        "--surface-frames",
+        type=int,
+        default=120,
+        help="frames tracked for surface allocations, 0 to skip",
+    )
+    parser.add_argument(
+        "--surface-budget",
+        action="append",
+        default=[],
+        metavar="[SCENE=]N",
+        help="most surfaces a scene may allocate per frame",
+    )
+    parser.add_argument("--dt", type=float, default=1000 / 60, help="ms per frame")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--scenes",
+        nargs="*",
+        choices=[scene.value for scene in TitleMenuEnum],
+        default=[scene.value for scene in TitleMenuEnum],
+    )
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args(argv)
+    budgets = parse_budgets(args.surface_budget)
+
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+    classes = scene_classes()
+    report = {
+        "pygame": pygame.version.ver,
+        "video_driver": pygame.display.get_driver(),
+        "frames": args.frames,
+        "dt_ms": args.dt,
+        "scenes": {
+            name: benchmark_scene(
+                classes[TitleMenuEnum(name)],
+                screen,
+                args.frames,
+                args.dt,
+                args.seed,
+                args.alloc_frames,
+                args.surface_frames,
+            )
+            for name in args.scenes
+        },
+    }
+    failures = check_menu_selection(screen)
+    pygame.quit()
+
+    for name, result in report["scenes"].items():
+        budget = budgets.get(name, classes[TitleMenuEnum(name)].surface_budget)
+        failure = over_budget(name, result, budget)
+        if failure:
+            failures.append(failure)
+    report["failures"] = failures
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if failures:
+        sys.exit("\n".join(failures))
+    return report
+
+
+if __name__ == "__main__":
+    main()
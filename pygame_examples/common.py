@@ -3,6 +3,19 @@ from palette import PALETTE
 SCREEN_WIDTH = 640
 SCREEN_HEIGHT = 480
 
+# scenes draw their world with unscaled 16px tiles onto a surface PIXEL_SCALE
+# times smaller than the screen, and their HUD text onto a layer HUD_SCALE
+# times smaller, each upscaled once per frame (see utils.render.Framebuffer).
+# Rotating a 16px tile and upscaling the result would break its pixel art
+# into blocks, so rotated sprites are scaled up before rotating and drawn onto
+# a layer SPRITE_SCALE times smaller
+PIXEL_SCALE = 6
+HUD_SCALE = 2
+SPRITE_SCALE = 1
+
+# the simulation runs at a fixed rate whatever the frame rate
+STEP_MS = 1000 / 60
+
 # Colors from Catpuccino
 BASE_COLOR = PALETTE.mocha.colors.base.rgb.to_tuple()
 BLUE_COLOR = PALETTE.mocha.colors.blue.rgb.to_tuple()
@@ -1,60 +1,194 @@
+from utils.startup import STARTUP  # first, so the imports below are timed
+
 import pygame
 from pygame import K_ESCAPE
+import argparse
 import asyncio
 
-from scenes.warrior_swing import WarriorSwing
-from scenes.wizard_clock import WizardClock
-from scenes.animate_movement import AnimateMovement
-from scenes.collect_potions import CollectPotions
-from scenes.title_menu import TitleMenu
-
-from mapping.title_menu_enum import TitleMenuEnum
+from mapping.title_menu_enum import TitleMenuEnum, SCENE_MODULES
 from common import SCREEN_HEIGHT, SCREEN_WIDTH, BASE_COLOR
+from utils.render import Framebuffer
+from utils.scheduler import FrameScheduler
+from utils.clock import CLOCKS
+from utils.profiler import PROFILER
+from utils.telemetry import TelemetryRecorder
+from utils.sampling import ProfileCapture
+from utils.scene_registry import SceneManager, SceneRegistry
+from utils.assets import AssetLoader
+from scenes.loading_screen import LoadingScreen
+
+STARTUP.lap("imports")
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--telemetry", metavar="PATH", help="write per frame timings to a JSONL file"
+)
+parser.add_argument(
+    "--profile",
+    nargs="?",
+    const="sample",
+    choices=["sample", "cprofile"],
+    help="profile per scene between presses of F5",
+)
+parser.add_argument("--profile-dir", default="profiles")
+parser.add_argument(
+    "--profile-frames", type=int, help="stop each capture after this many frames"
+)
+parser.add_argument(
+    "--prewarm",
+    action="store_true",
+    help="construct the other scenes in the background after the first frame, "
+    "they stay resident until first visited",
+)
+parser.add_argument(
+    "--startup-report",
+    action="store_true",
+    help="print where the time to the first frame went",
+)
+parser.add_argument(
+    "--clock",
+    choices=list(CLOCKS),
+    default="real",
+    help="fixed steps every frame by the same time, turbo also never waits",
+)
+# pygbag may pass arguments of its own
+args, _ = parser.parse_known_args()
 
 # Initialize pygame
 pygame.init()
+STARTUP.lap("pygame.init")
 
-screen_display = pygame.display
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-clock = pygame.time.Clock()
+clock = CLOCKS[args.clock]()
+scheduler = FrameScheduler(clock)
+# only redraw and present what scenes report as changed
+framebuffer = Framebuffer(screen, background=BASE_COLOR, dirty_rects=True)
+STARTUP.lap("display")
+
+# scenes are constructed the first time they are selected, and only the
+# title menu and the last scene left stay resident when switching
+scenes = SceneManager(
+    SceneRegistry(SCENE_MODULES), pinned=[TitleMenuEnum.TitleMenu]
+)
+if args.prewarm:
+    scenes.prewarm()
+
+telemetry = None
+if args.telemetry:
+    telemetry = TelemetryRecorder(args.telemetry)
+    PROFILER.record()
+
+capture = None
+if args.profile:
+    capture = ProfileCapture(args.profile, args.profile_dir, args.profile_frames)
 
-title_screen = TitleMenu()
-collect_potions = CollectPotions()
-animate_movement = AnimateMovement()
-wizard_clock = WizardClock()
-warrior_swing = WarriorSwing()
+# assets are decoded a slice at a time before a scene is first constructed
+loader = AssetLoader()
+loading_screen = LoadingScreen()
+
+
+def show_loading(progress):
+    # keep the window responsive, input is ignored until the scene is loaded
+    pygame.event.pump()
+    loading_screen.progress = progress
+    canvas = framebuffer.begin(loading_screen.pixel_scale)
+    loading_screen.render(canvas, 0, [], None)
+    framebuffer.present(loading_screen.dirty_rects)
 
 
 async def main():
     running = True
     title_selected = None
-    while running:
-        events = []
-        for event in pygame.event.get():
-            events.append(event.type)
-            if event.type == pygame.QUIT:
-                running = False
-
-        screen.fill(BASE_COLOR)
-        keys = pygame.key.get_pressed()
-        if keys[K_ESCAPE]:
-            title_selected = TitleMenuEnum.TitleMenu
-        if title_selected is None or title_selected == TitleMenuEnum.TitleMenu:
-            title_selected: TitleMenuEnum | None = title_screen.render(
-                screen, clock, events, keys
+    try:
+        while running:
+            PROFILER.begin_frame()
+            events = []
+            for event in pygame.event.get():
+                events.append(event.type)
+                if event.type == pygame.QUIT:
+                    running = False
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    PROFILER.toggle()
+                if (
+                    event.type == pygame.KEYDOWN
+                    and event.key == pygame.K_F5
+                    and capture is not None
+                ):
+                    for path in capture.toggle():
+                        print(f"Wrote {path}")
+            PROFILER.lap("events")
+
+            keys = pygame.key.get_pressed()
+            if keys[K_ESCAPE]:
+                title_selected = TitleMenuEnum.TitleMenu
+            scene_key = title_selected or TitleMenuEnum.TitleMenu
+            scene_changed = scene_key != scenes.active
+            if not scenes.registry.constructed(scene_key):
+                loader.queue(scenes.registry.scene_class(scene_key).assets)
+                await loader.load(show_loading)
+            scene = scenes.switch(scene_key)
+            loader.release()
+            if capture is not None:
+                for path in capture.frame(type(scene).__name__):
+                    print(f"Wrote {path}")
+
+            dt = scheduler.tick(scene, events)
+            PROFILER.lap("wait")
+
+            # scenes draw onto a logical surface which is upscaled once
+            if scene_changed:
+                framebuffer.invalidate()
+            canvas = framebuffer.begin(
+                scene.pixel_scale, scene.hud_scale, scene.sprite_scale
+            )
+            selected = scene.render(
+                canvas,
+                dt,
+                events,
+                keys,
+                hud=framebuffer.hud,
+                sprites=framebuffer.sprites,
             )
-        elif title_selected == TitleMenuEnum.CollectPotions:
-            collect_potions.render(screen, clock, events, keys)
-        elif title_selected == TitleMenuEnum.AnimateMovement:
-            animate_movement.render(screen, clock, events, keys)
-        elif title_selected == TitleMenuEnum.WizardClock:
-            wizard_clock.render(screen, clock, events, keys)
-        elif title_selected == TitleMenuEnum.WarriorSwing:
-            warrior_swing.render(screen, clock, events, keys)
-
-        screen_display.update()
-        pygame.display.flip()
-        await asyncio.sleep(0)  # Let other tasks run
+            if scene_key == TitleMenuEnum.TitleMenu:
+                title_selected: TitleMenuEnum | None = selected
+
+            dirty_rects, hud_rects = scene.dirty_rects, scene.hud_rects
+            if PROFILER.enabled:
+                # toggle with F3, the overlay is cleared like any other dirty rect,
+                # on the HUD layer when the scene has one
+                if framebuffer.hud is None:
+                    overlay = PROFILER.draw(canvas)
+                    if dirty_rects is not None:
+                        dirty_rects = dirty_rects + [overlay]
+                else:
+                    overlay = PROFILER.draw(framebuffer.hud)
+                    if hud_rects is not None:
+                        hud_rects = hud_rects + [overlay]
+            PROFILER.lap("overlay")
+            framebuffer.present(dirty_rects, hud_rects, scene.sprite_rects)
+            PROFILER.lap("present")
+            if not STARTUP.finished:
+                STARTUP.finish()
+                if args.startup_report:
+                    print(STARTUP.report())
+            elif scenes.prewarm_step() is not None:
+                # constructing a scene is not this frame's work
+                PROFILER.lap("prewarm")
+            if telemetry is not None:
+                telemetry.record(
+                    type(scene).__name__,
+                    dt,
+                    PROFILER.current(),
+                    1000 / scheduler.target_fps(scene),
+                )
+            await asyncio.sleep(0)  # Let other tasks run
+    finally:
+        # also on Ctrl-C or an exception, which is how soak runs usually end
+        if telemetry is not None:
+            telemetry.close()
+        if capture is not None:
+            for path in capture.stop():
+                print(f"Wrote {path}")
 
 
 # This is the program entry point
@@ -7,3 +7,13 @@ class TitleMenuEnum(str, Enum):
     AnimateMovement = "AnimateMovement"
     WizardClock = "WizardClock"
     WarriorSwing = "WarriorSwing"
+
+
+# module defining each scene, as a class named after its TitleMenuEnum value
+SCENE_MODULES = {
+    TitleMenuEnum.TitleMenu: "scenes.title_menu",
+    TitleMenuEnum.CollectPotions: "scenes.collect_potions",
+    TitleMenuEnum.AnimateMovement: "scenes.animate_movement",
+    TitleMenuEnum.WizardClock: "scenes.wizard_clock",
+    TitleMenuEnum.WarriorSwing: "scenes.warrior_swing",
+}
@@ -14,11 +14,16 @@ Demonstrates how to:
 """
 
 import pygame
-from common import SCREEN_HEIGHT, SCREEN_WIDTH
+from common import SCREEN_HEIGHT, SCREEN_WIDTH, PIXEL_SCALE, HUD_SCALE, STEP_MS
 
-from pygame import transform
 from base import BaseScene
 from utils.spritesheet_utils import SpritesheetUtils, FontUtils, BASE_ASSET_PATH
+from utils.timestep import InterpolatedSprite
+from utils.timers import TimerQueue
+from utils.animation import Animator, AnimationMode, strip_animation
+from utils.render import BatchedRenderUpdates
+from utils.profiler import PROFILER
+from utils.assets import SOUND_CACHE
 from common import TEXT_COLOR
 from enum import Enum
 import math
@@ -37,168 +42,160 @@ class AnimateOpenClose(Enum):
 WIZARD_TILE = (0, 7)
 CHEST_TILE = (5, 7)
 SWITCH_TILE = (1, 5)
-MOVEMENT_SPEED = 0.5
-FPS = 60
+WIDTH, HEIGHT = SCREEN_WIDTH // PIXEL_SCALE, SCREEN_HEIGHT // PIXEL_SCALE
 
-SCALE = 6
+# logical pixels per ms
+MOVEMENT_SPEED = 0.5 / PIXEL_SCALE
+FPS = 60
+# the chest shows each frame of opening or closing for this long
+CHEST_FRAME_MS = STEP_MS
 
 PADDING = 16
 LINE_HEIGHT = 16
-TEXT_SCALE = 2
 
 
-class Wizard(pygame.sprite.Sprite):
+class Wizard(InterpolatedSprite):
     def __init__(self):
         super().__init__()
-        self.scale = SCALE
         self.tile_size = (16, 16)
-        self.tile_size_scale = tuple([x * self.scale for x in list(self.tile_size)])
         self.ss = SpritesheetUtils(
             "tiny_dungeon/tilemap_packed.png",
             tile_size=self.tile_size,
             colorkey=(0, 0, 0),
         )
-        self.image = transform.scale_by(self.ss.image_at_tile(WIZARD_TILE), self.scale)
+        self.image = self.ss.image_at_tile(WIZARD_TILE)
         self.rect = self.image.get_rect()
-        self.rect.x = SCREEN_WIDTH // 4
-        self.rect.y = SCREEN_HEIGHT // 4
+        self.rect.x = WIDTH // 4
+        self.rect.y = HEIGHT // 4
 
     def update(self, x, y, screen_size):
-        self.rect.x += x
-        self.rect.y += y
-        self.rect.x = min(max(self.rect.x, 0), screen_size[0] - self.tile_size_scale[0])
-        self.rect.y = min(max(self.rect.y, 0), screen_size[1] - self.tile_size_scale[1])
+        self.move(x, y, (0, 0, *screen_size))
 
 
 class Switch(pygame.sprite.Sprite):
     def __init__(self):
         super().__init__()
-        self.scale = SCALE
         self.tile_size = (16, 16)
-        self.tile_size_scale = tuple([x * self.scale for x in list(self.tile_size)])
         self.ss = SpritesheetUtils(
             "tiny_dungeon/tilemap_packed.png",
             tile_size=self.tile_size,
             colorkey=(0, 0, 0),
         )
-        self.image = transform.scale_by(self.ss.image_at_tile(SWITCH_TILE), self.scale)
+        self.image = self.ss.image_at_tile(SWITCH_TILE)
         self.rect = self.image.get_rect()
-        self.rect.center = (SCREEN_WIDTH // 2 + SCREEN_WIDTH // 4, SCREEN_HEIGHT // 2)
+        self.rect.center = (WIDTH // 2 + WIDTH // 4, HEIGHT // 2)
 
 
 class Chest(pygame.sprite.Sprite):
-    def __init__(self):
+    def __init__(self, animator):
         super().__init__()
-        self.scale = SCALE
         self.tile_size = (16, 16)
-        self.tile_size_scale = tuple([x * self.scale for x in list(self.tile_size)])
         self.ss = SpritesheetUtils(
             "tiny_dungeon/tilemap_packed.png",
             tile_size=self.tile_size,
             colorkey=(0, 0, 0),
         )
-        self.images = [
-            transform.scale_by(
-                self.ss.image_at_tile((CHEST_TILE[0] + idx, CHEST_TILE[1])), self.scale
+        strip = (
+            CHEST_TILE[0] * self.tile_size[0],
+            CHEST_TILE[1] * self.tile_size[1],
+            *self.tile_size,
+        )
+        self.opening, self.closing = [
+            strip_animation(
+                self.ss,
+                strip,
+                3,
+                CHEST_FRAME_MS,
+                AnimationMode.ONE_SHOT,
+                reverse=reverse,
             )
-            for idx in range(3)
+            for reverse in (False, True)
         ]
-        self.image = self.images[0]
+        self.image = self.closing.frames[-1]
         self.rect = self.image.get_rect()
-        self.rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+        self.rect.center = (WIDTH // 2, HEIGHT // 2)
 
-        self._animate_frame_time = None
-        self._frame = 0
-        self.open_close_status: str = ""
-        self.animating = AnimateOpenClose.OTHER
+        self.animator = animator
+        self.open_close_status = AnimateOpenClose.CLOSE
 
-        self.sound_open = pygame.mixer.Sound(
+        self.sound_open = SOUND_CACHE.load(
             BASE_ASSET_PATH.joinpath("rpg_audio/doorOpen_1.ogg")
         )
         self.sound_open.set_volume(0.3)
-        self.sound_close = pygame.mixer.Sound(
+        self.sound_close = SOUND_CACHE.load(
             BASE_ASSET_PATH.joinpath("rpg_audio/doorClose_4.ogg")
         )
         self.sound_close.set_volume(0.3)
 
     def update(self, trigger_chest: bool = False):
-        if (
-            trigger_chest and self.open_close_status == AnimateOpenClose.CLOSE
-        ) or self.animating == AnimateOpenClose.OPEN:
-            if (
-                self._animate_frame_time is None
-                or self._animate_frame_time > pygame.time.get_ticks()
-            ):
-                if trigger_chest:
-                    self.sound_close.play()
-                self._animate_frame_time = pygame.time.get_ticks() + 2000
-                self._frame = min(self._frame + 1, AnimateOpenClose.OPEN.value)
-                self.image = self.images[self._frame]
-                self.animating = AnimateOpenClose.OPEN
-
-        elif (
-            trigger_chest and self.open_close_status == AnimateOpenClose.OPEN
-        ) or self.animating == AnimateOpenClose.CLOSE:
-            if (
-                self._animate_frame_time is None
-                or self._animate_frame_time > pygame.time.get_ticks()
-            ):
-                if trigger_chest:
-                    self.sound_open.play()
-                self._animate_frame_time = pygame.time.get_ticks() + 2000
-                self._frame = max(self._frame - 1, AnimateOpenClose.CLOSE.value)
-                self.image = self.images[self._frame]
-                self.animating = AnimateOpenClose.CLOSE
-
-        if self._frame == AnimateOpenClose.OPEN.value:
-            self.open_close_status = AnimateOpenClose.OPEN
-            self.animating = None
-            self._animate_frame_time = None
-        elif self._frame == AnimateOpenClose.CLOSE.value:
-            self.open_close_status = AnimateOpenClose.CLOSE
-            self.animating = None
-            self._animate_frame_time = None
+        """Starts opening or closing, the animator shows the frames"""
+        if not trigger_chest or self.open_close_status == AnimateOpenClose.OTHER:
+            return
+        if self.open_close_status == AnimateOpenClose.CLOSE:
+            self.sound_close.play()
+            animation, status = self.opening, AnimateOpenClose.OPEN
         else:
-            self.open_close_status = AnimateOpenClose.OTHER
+            self.sound_open.play()
+            animation, status = self.closing, AnimateOpenClose.CLOSE
+        self.open_close_status = AnimateOpenClose.OTHER
+        self.animator.play(self, animation, self._finished, status)
+
+    def _finished(self, status):
+        self.open_close_status = status
 
 
 class AnimateMovement(BaseScene):
+    pixel_scale = PIXEL_SCALE
+    hud_scale = HUD_SCALE
+    fps = FPS
+    step_ms = STEP_MS
+    # everything it draws is cached after the first frames
+    surface_budget = 0
+    assets = (
+        "tiny_dungeon/tilemap_packed.png",
+        "bitmap_font/kenney-pixel.png",
+        "rpg_audio/doorOpen_1.ogg",
+        "rpg_audio/doorClose_4.ogg",
+    )
+
     def __init__(self):
         self.font = FontUtils()
         self.tile_size = (16, 16)
-        self.tile_size_scale = tuple([x * SCALE for x in list(self.tile_size)])
         self.screen = None
-        self.screen_size = (600, 400)
+        self.hud = None
+        self.screen_size = (WIDTH, HEIGHT)
 
-        self.wizard_group = pygame.sprite.Group()
-        self.chest_group = pygame.sprite.Group()
+        self.wizard_group = BatchedRenderUpdates()
+        self.chest_group = BatchedRenderUpdates()
         self.wizard = Wizard()
-        self.chest = Chest()
+        self.timers = TimerQueue()
+        self.animator = Animator()
+        self.chest = Chest(self.animator)
         self.chest_group.add(Switch(), self.chest)
         self.wizard_group.add(self.wizard)
 
-        self._trigger_update_lock = None
+        # the switch can't be used again while this is active
+        self._trigger_cooldown = None
+
+    def suspend(self):
+        # don't let the chest creak over the next scene
+        self.chest.sound_open.stop()
+        self.chest.sound_close.stop()
 
     def draw_text(self):
         screen_text_color = ["Move around using Keyboard", "Use [z] to interact"]
 
+        rects = []
         for indx, text in enumerate(screen_text_color):
-            self.screen.blit(
-                transform.scale_by(
-                    self.font.text_to_image_shadow_effect(text, TEXT_COLOR), TEXT_SCALE
-                ),
-                (
-                    PADDING * TEXT_SCALE,
-                    PADDING * TEXT_SCALE + LINE_HEIGHT * indx * TEXT_SCALE,
-                ),
+            rects.append(
+                self.hud.blit(
+                    self.font.text_surface(text, TEXT_COLOR),
+                    (PADDING, PADDING + LINE_HEIGHT * indx),
+                )
             )
+        return rects
 
-    def render(self, screen, clock, events, keys):
-        pygame.mouse.set_visible(True)
-        self.screen = screen
-        self.screen_size = screen.get_size()
-        dt = clock.tick(FPS)
-
+    def update(self, dt, events, keys):
         x, y = 0, 0
         if keys[pygame.K_UP] and not keys[pygame.K_DOWN]:
             y = -MOVEMENT_SPEED * dt
@@ -208,8 +205,8 @@ class AnimateMovement(BaseScene):
             x = -MOVEMENT_SPEED * dt
         elif keys[pygame.K_RIGHT] and not keys[pygame.K_LEFT]:
             x = MOVEMENT_SPEED * dt
+        PROFILER.lap("input")
 
-        self.chest_group.update()
         collision_list = pygame.sprite.spritecollide(
             self.wizard, self.chest_group, False
         )
@@ -247,16 +244,24 @@ class AnimateMovement(BaseScene):
         if (
             any([isinstance(x, Switch) for x in collision_list])
             and keys[pygame.K_z]
-            and (
-                self._trigger_update_lock is None
-                or self._trigger_update_lock < pygame.time.get_ticks()
-            )
+            and not self.timers.active(self._trigger_cooldown)
         ):
             self.chest_group.update(trigger_chest=True)
-            self._trigger_update_lock = pygame.time.get_ticks() + 400  # lock for x ms
+            self._trigger_cooldown = self.timers.after(400)  # lock for x ms
+        PROFILER.lap("collide")
 
         self.wizard_group.update(x, y, self.screen_size)
-        self.chest_group.draw(screen)
-        self.wizard_group.draw(screen)
+        PROFILER.lap("update")
+
+    def draw(self, screen, alpha, hud=None, sprites=None):
+        pygame.mouse.set_visible(True)
+        self.screen = screen
+        self.hud = hud
+        self.screen_size = screen.get_size()
+
+        self.dirty_rects = self.chest_group.draw(screen, alpha=alpha)
+        self.dirty_rects += self.wizard_group.draw(screen, alpha=alpha)
+        PROFILER.lap("draw")
 
-        self.draw_text()
+        self.hud_rects = self.draw_text()
+        PROFILER.lap("hud")
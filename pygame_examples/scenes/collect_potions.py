@@ -10,17 +10,23 @@ Key concepts:
 - Responding to keyboard and mouse events
 - Responding to timer events (locking how quickly gravity is switched on/off)
 - Understanding sprite collisions and sprite groups
+- Simulating many potions at once with NumPy arrays
 
 """
 
 from typing import Tuple
+import numpy as np
 import pygame
 import random
 
-from common import SCREEN_HEIGHT, SCREEN_WIDTH
-from pygame import transform
+from common import SCREEN_HEIGHT, SCREEN_WIDTH, HUD_SCALE, STEP_MS
 from base import BaseScene
 from utils.spritesheet_utils import SpritesheetUtils, FontUtils
+from utils.timestep import InterpolatedSprite
+from utils.timers import TimerQueue
+from utils.render import to_logical, blit_batch, BatchedRenderUpdates
+from utils.spatial_hash import SpatialHash
+from utils.profiler import PROFILER
 from common import TEXT_COLOR, BLUE_COLOR
 from enum import Enum
 
@@ -30,13 +36,24 @@ WIZARD_TILE = (0, 7)
 NUM_POTIONS = 15
 LINE_HEIGHT = 32
 
-MOVEMENT_SPEED = 0.5
-GRAVITY_SPEED = 0.1
+# potions and the wizard are drawn at twice their size, the scale of the HUD
+WORLD_SCALE = HUD_SCALE
+WIDTH, HEIGHT = SCREEN_WIDTH // WORLD_SCALE, SCREEN_HEIGHT // WORLD_SCALE
+
+# speeds are in logical pixels per ms
+MOVEMENT_SPEED = 0.5 / WORLD_SCALE
+GRAVITY_SPEED = 0.1 / WORLD_SCALE
 FPS = 60
 
 PADDING = 16
 LINE_HEIGHT = 16
-SCALE = 2
+
+
+def _sample(population, k):
+    # distinct rows and columns while there are enough, repeats beyond that
+    if k <= len(population):
+        return random.sample(population, k=k)
+    return random.choices(population, k=k)
 
 
 class InputMode(str, Enum):
@@ -44,47 +61,71 @@ class InputMode(str, Enum):
     MOUSE = "MOUSE"
 
 
-class Wizard(pygame.sprite.Sprite):
+class Wizard(InterpolatedSprite):
     tile_size = (16, 16)
 
     def __init__(self):
         super().__init__()
-        self.tile_size_scaled = tuple([x * SCALE for x in list(self.tile_size)])
         self.ss = SpritesheetUtils(
             "tiny_dungeon/tilemap_packed.png",
             tile_size=self.tile_size,
             colorkey=(0, 0, 0),
         )
-        self.image = transform.scale_by(self.ss.image_at_tile(WIZARD_TILE), 2)
+        self.image = self.ss.image_at_tile(WIZARD_TILE)
         self.rect = self.image.get_rect()
-        self.rect.x = SCREEN_WIDTH // 4
-        self.rect.y = SCREEN_HEIGHT // 4
+        self.rect.x = WIDTH // 4
+        self.rect.y = HEIGHT // 4
 
     def update(self, x, y, screen_size):
-        self.rect.x += x
-        self.rect.y += y
-        self.rect.x = min(
-            max(self.rect.x, 0), screen_size[0] - self.tile_size_scaled[0]
-        )
-        self.rect.y = min(
-            max(self.rect.y, 0), screen_size[1] - self.tile_size_scaled[1]
-        )
+        self.move(x, y, (0, 0, *screen_size))
+
+
+class PotionField:
+    """Every potion in the scene, stored as arrays rather than sprites.
 
+    Positions are floats so slow gravity is not truncated, and gravity and
+    wrapping around the bottom of the screen are one vectorized step for all
+    potions. Potions are indexed by their position in the arrays, collected
+    ones are masked out until the field is refilled with `reset`. Rects are
+    only materialized to draw and when a potion changes spatial hash cells.
+    """
 
-class Potion(pygame.sprite.Sprite):
     tile_size = (16, 16)
 
-    def __init__(self, x, y):
-        super().__init__()
+    def __init__(self):
         self.ss = SpritesheetUtils(
             "tiny_dungeon/tilemap_packed.png",
             tile_size=self.tile_size,
             colorkey=(0, 0, 0),
+            atlas=True,
         )
-        self.image = transform.scale_by(self.ss.image_at_tile(POTION_TILE), SCALE)
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y
+        self.image = self.ss.image_at_tile(POTION_TILE)
+        self.size = self.image.get_size()
+        # broadphase for the wizard vs potion collisions, one cell per potion
+        self.hash = SpatialHash(self.size)
+        self.reset([])
+
+    def reset(self, positions):
+        positions = np.array(positions, dtype=float).reshape(-1, 2)
+        self.x = positions[:, 0]
+        self.y = positions[:, 1]
+        self.velocity = np.full(len(positions), GRAVITY_SPEED)
+        self.alive = np.ones(len(positions), dtype=bool)
+        # positions before the last step, to draw interpolated positions from
+        self.previous_y = self.y.copy()
+
+        self.hash.clear()
+        self._cells = self._cell_rows()
+        for index in range(len(positions)):
+            self.hash.insert(index, self.rect(index))
+
+    def rect(self, index):
+        return pygame.Rect(int(self.x[index]), int(self.y[index]), *self.size)
+
+    def _cell_rows(self):
+        """First and last hash cell row of every potion"""
+        top = self.y.astype(int)
+        return top // self.size[1], (top + self.size[1] - 1) // self.size[1]
 
     def update(
         self,
@@ -92,24 +133,84 @@ class Potion(pygame.sprite.Sprite):
         dt: float = 0,
         screen_size: Tuple[int, int] = (800, 800),
     ):
+        np.copyto(self.previous_y, self.y)
         if gravity_enabled:
-            self.rect.y += GRAVITY_SPEED * dt
-        if self.rect.bottom > screen_size[1]:
-            self.rect.y = 0
+            self.y += self.velocity * dt
+        self.y[self.y.astype(int) + self.size[1] > screen_size[1]] = 0
+
+        # only potions that changed cells are re-bucketed
+        first, last = self._cell_rows()
+        moved = self.alive & ((first != self._cells[0]) | (last != self._cells[1]))
+        for index in np.flatnonzero(moved).tolist():
+            self.hash.update(index, self.rect(index))
+        self._cells = (first, last)
+
+    def collide(self, rect):
+        """Returns the indices of the potions overlapping `rect`"""
+        candidates = np.fromiter(self.hash.candidates(rect), dtype=int)
+        x = self.x[candidates].astype(int)
+        y = self.y[candidates].astype(int)
+        overlap = (
+            (x < rect.right)
+            & (x + self.size[0] > rect.left)
+            & (y < rect.bottom)
+            & (y + self.size[1] > rect.top)
+        )
+        return candidates[overlap]
+
+    def kill(self, indices):
+        self.alive[indices] = False
+        self.hash.remove(*indices.tolist())
+
+    def draw(self, surface, alpha=None):
+        alive = np.flatnonzero(self.alive)
+        y = self.y[alive]
+        if alpha is not None:
+            # potions wrapping around to the top are not drawn in between
+            previous = self.previous_y[alive]
+            y = np.where(previous <= y, previous + (y - previous) * alpha, y)
+        # every potion shares one image, there is nothing to sort
+        return blit_batch(
+            surface,
+            [
+                (self.image, position)
+                for position in zip(
+                    self.x[alive].astype(int).tolist(),
+                    y.astype(int).tolist(),
+                )
+            ],
+            sort=False,
+        )
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive))
 
 
 class CollectPotions(BaseScene):
+    pixel_scale = WORLD_SCALE
+    # the HUD is drawn straight onto the world, at the same scale
+    hud_scale = HUD_SCALE
+    fps = FPS
+    step_ms = STEP_MS
+    # a changed HUD line renders 6 surfaces, the score and gravity can change
+    # in the same frame
+    surface_budget = 12
+    assets = ("tiny_dungeon/tilemap_packed.png", "bitmap_font/kenney-pixel.png")
+
     def __init__(self):
         self.font = FontUtils()
         self.screen = None
-        self.screen_size = (SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.hud = None
+        self.screen_size = (WIDTH, HEIGHT)
         self.input_mode: InputMode = InputMode.MOUSE
         self.gravity_enabled: bool = False
-        self._gravity_update_lock: bool = None
+        self.timers = TimerQueue()
+        # gravity can't be toggled again while this is active
+        self._gravity_cooldown = None
 
         self.score = 0
-        self.potion_group = pygame.sprite.Group()
-        self.wizard_group = pygame.sprite.Group()
+        self.potions = PotionField()
+        self.wizard_group = BatchedRenderUpdates()
         self.wizard = Wizard()
         self.wizard_group.add(self.wizard)
         self._reset_potions()
@@ -131,50 +232,47 @@ class CollectPotions(BaseScene):
             ),
         ]
 
+        rects = []
         for indx, (text, color) in enumerate(screen_text_color):
-            self.screen.blit(
-                transform.scale_by(
-                    self.font.text_to_image_shadow_effect(text, color), SCALE
-                ),
-                (PADDING * SCALE, PADDING * SCALE + LINE_HEIGHT * indx * SCALE),
+            rects.append(
+                self.hud.blit(
+                    self.font.text_surface(text, color),
+                    (PADDING, PADDING + LINE_HEIGHT * indx),
+                )
             )
+        return rects
 
     def _reset_potions(self):
-        x_range = self.screen_size[0] // Potion.tile_size[0] - 1
-        y_range = self.screen_size[1] // Potion.tile_size[1] - 1
-        for x, y in [
-            (x * Potion.tile_size[0], y * Potion.tile_size[1])
-            for x, y in zip(
-                random.sample(range(x_range), k=NUM_POTIONS),
-                random.sample(range(y_range), k=NUM_POTIONS),
-            )
-        ]:
-            self.potion_group.add(Potion(x, y))
+        # potions are placed on a grid of one unscaled tile on the screen
+        grid_size = tuple([x // WORLD_SCALE for x in PotionField.tile_size])
+        x_range = self.screen_size[0] // grid_size[0] - 1
+        y_range = self.screen_size[1] // grid_size[1] - 1
+        self.potions.reset(
+            [
+                (x * grid_size[0], y * grid_size[1])
+                for x, y in zip(
+                    _sample(range(x_range), k=NUM_POTIONS),
+                    _sample(range(y_range), k=NUM_POTIONS),
+                )
+            ]
+        )
 
     def reset_potions_if_required(self):
-        if len(self.potion_group.sprites()) == 0:
+        if len(self.potions) == 0:
             self._reset_potions()
 
-    def render(self, screen, clock, events, keys):
-        self.screen = screen
-        self.screen_size = screen.get_size()
-        dt = clock.tick(FPS)
-        pygame.mouse.set_visible(self.input_mode == InputMode.KEYBOARD)
-
+    def update(self, dt, events, keys):
         if keys[pygame.K_k]:
             self.input_mode = InputMode.KEYBOARD
         if keys[pygame.K_m]:
             self.input_mode = InputMode.MOUSE
 
-        if keys[pygame.K_g] and (
-            self._gravity_update_lock is None
-            or self._gravity_update_lock < pygame.time.get_ticks()
-        ):
+        if keys[pygame.K_g] and not self.timers.active(self._gravity_cooldown):
             self.gravity_enabled = not self.gravity_enabled
-            self._gravity_update_lock = pygame.time.get_ticks() + 400  # lock for x ms
+            self._gravity_cooldown = self.timers.after(400)  # lock for x ms
 
         if self.input_mode == InputMode.MOUSE:
-            self.wizard.rect.center = pygame.mouse.get_pos()
+            self.wizard.rect.center = to_logical(pygame.mouse.get_pos(), WORLD_SCALE)
         if self.input_mode == InputMode.KEYBOARD:
             x, y = 0, 0
             if keys[pygame.K_UP] and not keys[pygame.K_DOWN]:
@@ -187,19 +285,28 @@ class CollectPotions(BaseScene):
                 x = MOVEMENT_SPEED * dt
 
             self.wizard_group.update(x, y, self.screen_size)
+        PROFILER.lap("input")
 
-        self.potion_group.update(self.gravity_enabled, dt, self.screen_size)
+        self.potions.update(self.gravity_enabled, dt, self.screen_size)
+        PROFILER.lap("update")
 
-        # check collision, remove and update
-        start = len(self.potion_group.sprites())
-        pygame.sprite.groupcollide(
-            self.wizard_group, self.potion_group, dokilla=False, dokillb=True
-        )
-        diff_score = start - len(self.potion_group.sprites())
-        self.score += diff_score
+        # check collision against nearby potions only, remove and update
+        collected = self.potions.collide(self.wizard.rect)
+        self.potions.kill(collected)
+        self.score += len(collected)
+        PROFILER.lap("collide")
+        self.reset_potions_if_required()
+        PROFILER.lap("update")
+
+    def draw(self, screen, alpha, hud=None, sprites=None):
+        self.screen = screen
+        self.hud = hud
+        self.screen_size = screen.get_size()
+        pygame.mouse.set_visible(self.input_mode == InputMode.KEYBOARD)
 
-        self.potion_group.draw(screen)
-        self.wizard_group.draw(screen)
+        self.dirty_rects = self.potions.draw(screen, alpha)
+        self.dirty_rects += self.wizard_group.draw(screen, alpha=alpha)
+        PROFILER.lap("draw")
 
-        self.draw_score()
-        self.reset_potions_if_required()
+        self.hud_rects = self.draw_score()
+        PROFILER.lap("hud")
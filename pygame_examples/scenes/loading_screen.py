@@ -0,0 +1,31 @@
+"""
+Shown while utils.assets.AssetLoader decodes the next scene's assets
+"""
+
+import pygame
+from common import SCREEN_HEIGHT, SCREEN_WIDTH, HUD_SCALE, SURFACE0_COLOR, TEXT_COLOR
+
+from base import BaseScene
+
+WIDTH, HEIGHT = SCREEN_WIDTH // HUD_SCALE, SCREEN_HEIGHT // HUD_SCALE
+
+BAR_WIDTH = WIDTH // 2
+BAR_HEIGHT = 6
+
+
+class LoadingScreen(BaseScene):
+    """A progress bar, drawn without any assets since none may be loaded yet"""
+
+    pixel_scale = HUD_SCALE
+
+    def __init__(self):
+        self.progress = 0.0
+        self.rect = pygame.Rect(0, 0, BAR_WIDTH, BAR_HEIGHT)
+        self.rect.center = (WIDTH // 2, HEIGHT // 2)
+
+    def render(self, screen, dt, events, keys, hud=None, sprites=None):
+        pygame.draw.rect(screen, SURFACE0_COLOR, self.rect)
+        filled = self.rect.copy()
+        filled.w = int(self.rect.w * min(max(self.progress, 0.0), 1.0))
+        pygame.draw.rect(screen, TEXT_COLOR, filled)
+        self.dirty_rects = [self.rect]
@@ -1,14 +1,14 @@
 import pygame
 from base import BaseScene
 from utils.spritesheet_utils import FontUtils
+from utils.render import to_logical, BatchedRenderUpdates
+from utils.profiler import PROFILER
 from mapping.title_menu_enum import TitleMenuEnum
-from common import TEXT_COLOR, RED_COLOR
-from pygame import transform
+from common import TEXT_COLOR, RED_COLOR, HUD_SCALE
 import re
 
 PADDING = 16
 LINE_HEIGHT = 16
-SCALE = 2
 
 
 SCENE_NAMES = {
@@ -27,20 +27,25 @@ class SceneText(pygame.sprite.Sprite):
         self._unselected_color = TEXT_COLOR
         self.set_image()
         self.rect = self.image.get_rect()
-        self.rect.x = PADDING * SCALE
-        self.rect.y = PADDING * SCALE + LINE_HEIGHT * index * SCALE
+        self.rect.x = PADDING
+        self.rect.y = PADDING + LINE_HEIGHT * index
 
     def set_image(self, collide: bool = False):
-        self.image = transform.scale_by(
-            self.font.text_to_image_shadow_effect(
-                f" {SCENE_NAMES[self.scene]}",
-                self._selected_color if collide else self._unselected_color,
-            ),
-            SCALE,
+        self.image = self.font.text_surface(
+            f" {SCENE_NAMES[self.scene]}",
+            self._selected_color if collide else self._unselected_color,
         )
 
 
 class TitleMenu(BaseScene):
+    # all text, so drawn at the scale of the other scenes' HUD
+    pixel_scale = HUD_SCALE
+    # nothing moves until the mouse does, so idle at a low rate
+    idle_fps = 10
+    # everything it draws is cached after the first frames
+    surface_budget = 0
+    assets = ("bitmap_font/kenney-pixel.png",)
+
     def __init__(self):
         self.font = FontUtils()
         self.screen = None
@@ -48,23 +53,27 @@ class TitleMenu(BaseScene):
         self.text_groups = {}
         self.text = {}
 
+        # keyed by TitleMenuEnum, render returns the key of a clicked scene
         for indx, scene in enumerate(SCENE_NAMES.keys()):
-            self.text_groups[scene.value] = pygame.sprite.Group()
-            self.text[scene.value] = SceneText(scene.value, indx)
-            self.text_groups[scene.value].add(self.text[scene.value])
+            self.text_groups[scene] = BatchedRenderUpdates()
+            self.text[scene] = SceneText(scene, indx)
+            self.text_groups[scene].add(self.text[scene])
 
-    def render(self, screen, clock, events, keys):
+    def render(self, screen, dt, events, keys, hud=None, sprites=None):
         pygame.mouse.set_visible(True)
         self.screen = screen
-        point = pygame.mouse.get_pos()
+        point = to_logical(pygame.mouse.get_pos(), self.pixel_scale)
+        PROFILER.lap("input")
 
         selected_menu = None
+        self.dirty_rects = []
 
         for key, text_group in self.text_groups.items():
             is_collide = self.text[key].rect.collidepoint(point)
             self.text[key].set_image(is_collide)
-            text_group.draw(screen)
+            self.dirty_rects += text_group.draw(screen)
             if is_collide and pygame.MOUSEBUTTONDOWN in events:
                 selected_menu = key
+        PROFILER.lap("draw")
 
         return selected_menu
@@ -3,11 +3,24 @@ This is a study into using transform rotation
 """
 
 import pygame
-from common import SCREEN_HEIGHT, SCREEN_WIDTH
+from common import (
+    SCREEN_HEIGHT,
+    SCREEN_WIDTH,
+    PIXEL_SCALE,
+    HUD_SCALE,
+    SPRITE_SCALE,
+    STEP_MS,
+)
 
 from pygame import transform
 from base import BaseScene
 from utils.spritesheet_utils import SpritesheetUtils, FontUtils
+from utils.rotation_cache import RotationCache
+from utils.timestep import InterpolatedSprite
+from utils.timers import TimerQueue
+from utils.tween import Easing, Tweens
+from utils.render import to_logical, BatchedRenderUpdates
+from utils.profiler import PROFILER
 from common import TEXT_COLOR
 from enum import Enum
 import math
@@ -25,61 +38,76 @@ class AnimateOpenClose(Enum):
 
 WARRIOR_TILE = (3, 7)
 BATTLEAXE_TILE = (10, 9)
-MOVEMENT_SPEED = 0.5
+# the axe is rotated on the sprite layer, and the warrior is drawn over it
+# there too, both this many times larger than their tiles
+TILE_SCALE = PIXEL_SCALE // SPRITE_SCALE
+WIDTH, HEIGHT = SCREEN_WIDTH // SPRITE_SCALE, SCREEN_HEIGHT // SPRITE_SCALE
 
-SCALE = 6
+# sprite layer pixels per ms
+MOVEMENT_SPEED = 0.5 / SPRITE_SCALE
 
 PADDING = 16
 LINE_HEIGHT = 16
-TEXT_SCALE = 2
 
 FPS = 60
+ROTATION_STEPS = 180
+# the axe swings this many degrees onto its target, then can't swing again
+# for a while
+SWING_ANGLE = 60
+SWING_MS = 50
+SWING_COOLDOWN_MS = 200
+SWING_EASING = Easing.LINEAR
 
 
-class Warrior(pygame.sprite.Sprite):
+class Warrior(InterpolatedSprite):
     def __init__(self):
         super().__init__()
-        self.scale = SCALE
         self.tile_size = (16, 16)
-        self.tile_size_scale = tuple([x * self.scale for x in list(self.tile_size)])
         self.ss = SpritesheetUtils(
             "tiny_dungeon/tilemap_packed.png",
             tile_size=self.tile_size,
             colorkey=(0, 0, 0),
         )
-        self.image = transform.scale_by(self.ss.image_at_tile(WARRIOR_TILE), self.scale)
+        self.image = transform.scale_by(self.ss.image_at_tile(WARRIOR_TILE), TILE_SCALE)
         self.rect = self.image.get_rect()
-        self.rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+        self.rect.center = (WIDTH // 2, HEIGHT // 2)
 
     def update(self, x, y, screen_size):
-        self.rect.x += x
-        self.rect.y += y
-        self.rect.x = min(max(self.rect.x, 0), screen_size[0] - self.tile_size_scale[0])
-        self.rect.y = min(max(self.rect.y, 0), screen_size[1] - self.tile_size_scale[1])
+        self.move(x, y, (0, 0, *screen_size))
 
 
-class BattleAxe(pygame.sprite.Sprite):
-    def __init__(self):
+class BattleAxe(InterpolatedSprite):
+    # rotated frames shared by every battle axe
+    rotations = None
+
+    def __init__(self, timers, tweens):
         super().__init__()
-        self.scale = SCALE
         self.tile_size = (16, 16)
-        self.tile_size_scale = tuple([x * self.scale for x in list(self.tile_size)])
         self.ss = SpritesheetUtils(
             "tiny_dungeon/tilemap_packed.png",
             tile_size=self.tile_size,
             colorkey=(0, 0, 0),
+            atlas=True,
         )
         self.image = transform.scale_by(
-            self.ss.image_at_tile(BATTLEAXE_TILE), self.scale
+            self.ss.image_at_tile(BATTLEAXE_TILE), TILE_SCALE
         )
         self.rect = self.image.get_rect()
-        self.rect.center = (SCREEN_WIDTH // 2 + SCREEN_WIDTH // 4, SCREEN_HEIGHT // 2)
+        self.rect.center = (WIDTH // 2 + WIDTH // 4, HEIGHT // 2)
         self.target_angle = 0
         self.target_angle_sign = 1
 
-        self._animate_frame_time = None
-        self._animating = False
-        self._weapon_frame_time = None
+        self.timers = timers
+        self.tweens = tweens
+        # how far the swing is from the target angle, eases to 0 as it swings
+        self._swing = tweens.add(duration=SWING_MS, easing=SWING_EASING, play=False)
+        # active until the axe can swing again
+        self._cooldown = None
+        if BattleAxe.rotations is None:
+            BattleAxe.rotations = RotationCache(
+                transform.flip(self.image, flip_x=False, flip_y=True),
+                steps=ROTATION_STEPS,
+            )
 
     def _current_angle(self, center, mouse_position):
             if center is None or mouse_position is None:
@@ -106,84 +134,72 @@ class BattleAxe(pygame.sprite.Sprite):
 
 
     def update(self, trigger: bool = False, center=None, mouse_position=None):
-        current_tick = pygame.time.get_ticks()
-        animation_time = 50
-        cooldown_time = 200
-        swing_angle = 60
-        if trigger and (self._animate_frame_time is None or self._animate_frame_time < current_tick):
-            self._weapon_frame_time = current_tick + animation_time
-            self._animate_frame_time = self._weapon_frame_time + cooldown_time
+        if trigger and not self.timers.active(self._cooldown):
+            self._cooldown = self.timers.after(SWING_MS + SWING_COOLDOWN_MS)
             self.target_angle, x_len, _ = self._current_angle(center, mouse_position)
             self.target_angle_sign = sign(x_len)
+            self.tweens.play(self._swing, SWING_ANGLE * self.target_angle_sign, 0)
 
 
-        if self._animate_frame_time is not None and self._animate_frame_time > current_tick:
+        if self.timers.active(self._cooldown):
             # animate
-            angle_ratio = max(self._weapon_frame_time - current_tick, 0)/animation_time
-            angle = self.target_angle + angle_ratio * swing_angle * self.target_angle_sign
-            radius = LINE_HEIGHT * SCALE
-            loc = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2) if center is None else center
-            self.image = transform.rotate(
-                transform.scale_by(
-                    transform.flip(
-                        self.ss.image_at_tile(BATTLEAXE_TILE), flip_x=False, flip_y=True
-                    ),
-                    self.scale,
-                ),
-                angle,
-            )
-            self.rect = self.image.get_rect()
+            angle = self.target_angle + self.tweens.value(self._swing)
+            radius = self.tile_size[1] * TILE_SCALE
+            loc = (WIDTH // 2, HEIGHT // 2) if center is None else center
             loc_x, loc_y = (
                 radius * math.sin(math.radians(angle)),
                 radius * math.cos(math.radians(angle)),
             )
-            self.rect.center = (loc[0] + loc_x, loc[1] + loc_y)
+            self.image, self.rect = self.rotations.rotate(
+                angle, (loc[0] + loc_x, loc[1] + loc_y)
+            )
         elif mouse_position is not None and center is not None:
             angle, _, _ = self._current_angle(center, mouse_position)
 
-            radius = LINE_HEIGHT * SCALE * 0.5
+            radius = self.tile_size[1] * TILE_SCALE * 0.5
             loc = center
-            self.image = transform.rotate(
-                transform.scale_by(
-                    transform.flip(
-                        self.ss.image_at_tile(BATTLEAXE_TILE), flip_x=False, flip_y=True
-                    ),
-                    self.scale,
-                ),
-                angle,
-            )
-            self.rect = self.image.get_rect()
             loc_x, loc_y = (
                 radius * math.sin(math.radians(angle)),
                 radius * math.cos(math.radians(angle))
             )
-            self.rect.center = (loc[0] + loc_x, loc[1] + loc_y)
+            self.image, self.rect = self.rotations.rotate(
+                angle, (loc[0] + loc_x, loc[1] + loc_y)
+            )
 
 
 
 
 
 class WarriorSwing(BaseScene):
+    pixel_scale = PIXEL_SCALE
+    hud_scale = HUD_SCALE
+    sprite_scale = SPRITE_SCALE
+    fps = FPS
+    step_ms = STEP_MS
+    # the rotation cache may render one more angle per frame
+    surface_budget = 1
+    assets = ("tiny_dungeon/tilemap_packed.png", "bitmap_font/kenney-pixel.png")
+
     def __init__(self):
         self.font = FontUtils()
         self.tile_size = (16, 16)
-        self.tile_size_scale = tuple([x * SCALE for x in list(self.tile_size)])
         self.screen = None
-        self.screen_size = (600, 400)
+        self.hud = None
+        self.screen_size = (WIDTH, HEIGHT)
 
-        self.warrior_group = pygame.sprite.Group()
-        self.battleaxe_group = pygame.sprite.Group()
+        self.warrior_group = BatchedRenderUpdates()
+        self.battleaxe_group = BatchedRenderUpdates()
         self.warrior = Warrior()
-        self.battle_axe = BattleAxe()
+        self.timers = TimerQueue()
+        self.tweens = Tweens()
+        self.battle_axe = BattleAxe(self.timers, self.tweens)
         self.warrior_group.add(self.warrior)
         self.battleaxe_group.add(self.battle_axe)
-        self.angle = 0
 
-    def calculate_angle(self, ticks):
-        # 60 secs per rotation, clockwise: -= (ticks/1000) * 2 * math.pi
-        SPEED = 10
-        self.angle += (ticks / 1000) * 2 * math.pi * SPEED
-        self.angle = self.angle % 360
+    def exit(self):
+        super().exit()
+        # the rotated frames are shared by every BattleAxe, drop them with the scene
+        BattleAxe.rotations = None
 
     def draw_text(self):
         screen_text_color = [
@@ -192,24 +208,17 @@ class WarriorSwing(BaseScene):
 
         ]
 
+        rects = []
         for indx, text in enumerate(screen_text_color):
-            self.screen.blit(
-                transform.scale_by(
-                    self.font.text_to_image_shadow_effect(text, TEXT_COLOR), TEXT_SCALE
-                ),
-                (
-                    PADDING * TEXT_SCALE,
-                    PADDING * TEXT_SCALE + LINE_HEIGHT * indx * TEXT_SCALE,
-                ),
+            rects.append(
+                self.hud.blit(
+                    self.font.text_surface(text, TEXT_COLOR),
+                    (PADDING, PADDING + LINE_HEIGHT * indx),
+                )
             )
+        return rects
 
-    def render(self, screen, clock, events, keys):
-        pygame.mouse.set_visible(True)
-        dt = clock.tick(FPS)
-        self.screen = screen
-        self.screen_size = screen.get_size()
-        self.calculate_angle(dt)
-
+    def update(self, dt, events, keys):
         trigger = False
         if pygame.MOUSEBUTTONDOWN in events:
             trigger = True
@@ -223,9 +232,25 @@ class WarriorSwing(BaseScene):
             x = -MOVEMENT_SPEED * dt
         elif keys[pygame.K_d] and not keys[pygame.K_a]:
             x = MOVEMENT_SPEED * dt
+        PROFILER.lap("input")
 
-        self.battleaxe_group.update(trigger, self.warrior.rect.center, pygame.mouse.get_pos())
+        self.battleaxe_group.update(
+            trigger,
+            self.warrior.rect.center,
+            to_logical(pygame.mouse.get_pos(), SPRITE_SCALE),
+        )
         self.warrior_group.update(x, y, self.screen_size)
-        self.battleaxe_group.draw(screen)
-        self.warrior_group.draw(screen)
-        self.draw_text()
+        PROFILER.lap("update")
+
+    def draw(self, screen, alpha, hud=None, sprites=None):
+        pygame.mouse.set_visible(True)
+        self.screen = screen
+        self.hud = hud
+        self.screen_size = sprites.get_size()
+
+        self.dirty_rects = []
+        self.sprite_rects = self.battleaxe_group.draw(sprites, alpha=alpha)
+        self.sprite_rects += self.warrior_group.draw(sprites, alpha=alpha)
+        PROFILER.lap("draw")
+        self.hud_rects = self.draw_text()
+        PROFILER.lap("hud")
@@ -3,11 +3,23 @@ This is a study into using transform rotation
 """
 
 import pygame
-from common import SCREEN_HEIGHT, SCREEN_WIDTH
+from common import (
+    SCREEN_HEIGHT,
+    SCREEN_WIDTH,
+    PIXEL_SCALE,
+    HUD_SCALE,
+    SPRITE_SCALE,
+    STEP_MS,
+)
 
 from pygame import transform
 from base import BaseScene
 from utils.spritesheet_utils import SpritesheetUtils, FontUtils
+from utils.rotation_cache import RotationCache
+from utils.timestep import InterpolatedSprite
+from utils.tween import Tweens
+from utils.render import BatchedRenderUpdates
+from utils.profiler import PROFILER
 from common import TEXT_COLOR
 from enum import Enum
 import math
@@ -25,96 +37,114 @@ class AnimateOpenClose(Enum):
 
 WIZARD_TILE = (0, 7)
 POTION_TILE = (5, 10)
-MOVEMENT_SPEED = 0.5
+WIDTH, HEIGHT = SCREEN_WIDTH // PIXEL_SCALE, SCREEN_HEIGHT // PIXEL_SCALE
+# the potion is rotated on the sprite layer, this many times larger
+WORLD_TO_SPRITES = PIXEL_SCALE // SPRITE_SCALE
 
-SCALE = 6
+# logical pixels per ms
+MOVEMENT_SPEED = 0.5 / PIXEL_SCALE
 
 PADDING = 16
 LINE_HEIGHT = 16
-TEXT_SCALE = 2
 
 FPS = 60
+ROTATION_STEPS = 180
+# the hand turns 2 * pi * 10 degrees a second
+HAND_PERIOD_MS = 360 * 1000 / (2 * math.pi * 10)
 
 
-class Wizard(pygame.sprite.Sprite):
+class Wizard(InterpolatedSprite):
     def __init__(self):
         super().__init__()
-        self.scale = SCALE
         self.tile_size = (16, 16)
-        self.tile_size_scale = tuple([x * self.scale for x in list(self.tile_size)])
         self.ss = SpritesheetUtils(
             "tiny_dungeon/tilemap_packed.png",
             tile_size=self.tile_size,
             colorkey=(0, 0, 0),
         )
-        self.image = transform.scale_by(self.ss.image_at_tile(WIZARD_TILE), self.scale)
+        self.image = self.ss.image_at_tile(WIZARD_TILE)
         self.rect = self.image.get_rect()
-        self.rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+        self.rect.center = (WIDTH // 2, HEIGHT // 2)
 
     def update(self, x, y, screen_size):
-        self.rect.x += x
-        self.rect.y += y
-        self.rect.x = min(max(self.rect.x, 0), screen_size[0] - self.tile_size_scale[0])
-        self.rect.y = min(max(self.rect.y, 0), screen_size[1] - self.tile_size_scale[1])
+        self.move(x, y, (0, 0, *screen_size))
 
 
-class Potion(pygame.sprite.Sprite):
+class Potion(InterpolatedSprite):
+    # rotated frames shared by every potion
+    rotations = None
+
     def __init__(self):
         super().__init__()
-        self.scale = SCALE
         self.tile_size = (16, 16)
-        self.tile_size_scale = tuple([x * self.scale for x in list(self.tile_size)])
         self.ss = SpritesheetUtils(
             "tiny_dungeon/tilemap_packed.png",
             tile_size=self.tile_size,
             colorkey=(0, 0, 0),
+            atlas=True,
+        )
+        self.image = transform.scale_by(
+            self.ss.image_at_tile(POTION_TILE), WORLD_TO_SPRITES
         )
-        self.image = transform.scale_by(self.ss.image_at_tile(POTION_TILE), self.scale)
         self.rect = self.image.get_rect()
-        self.rect.center = (SCREEN_WIDTH // 2 + SCREEN_WIDTH // 4, SCREEN_HEIGHT // 2)
+        self.rect.center = (
+            (WIDTH // 2 + WIDTH // 4) * WORLD_TO_SPRITES,
+            HEIGHT // 2 * WORLD_TO_SPRITES,
+        )
         self.angle = 0
+        if Potion.rotations is None:
+            Potion.rotations = RotationCache(
+                transform.flip(self.image, flip_x=False, flip_y=True),
+                steps=ROTATION_STEPS,
+            )
 
     def update(self, angle, center=None):
-        radius = LINE_HEIGHT * SCALE
-        loc = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2) if center is None else center
-        self.image = transform.rotate(
-            transform.scale_by(
-                transform.flip(
-                    self.ss.image_at_tile(POTION_TILE), flip_x=False, flip_y=True
-                ),
-                self.scale,
-            ),
-            angle,
-        )
-        self.rect = self.image.get_rect()
+        """Orbits `center`, in world coordinates"""
+        radius = self.tile_size[1] * WORLD_TO_SPRITES
+        if center is None:
+            center = (WIDTH // 2, HEIGHT // 2)
+        loc = (center[0] * WORLD_TO_SPRITES, center[1] * WORLD_TO_SPRITES)
         loc_x, loc_y = (
             radius * math.sin(math.radians(angle)),
             radius * math.cos(math.radians(angle)),
         )
-        self.rect.center = (loc[0] + loc_x, loc[1] + loc_y)
+        self.image, self.rect = self.rotations.rotate(
+            angle, (loc[0] + loc_x, loc[1] + loc_y)
+        )
 
 
 class WizardClock(BaseScene):
+    pixel_scale = PIXEL_SCALE
+    hud_scale = HUD_SCALE
+    sprite_scale = SPRITE_SCALE
+    fps = FPS
+    step_ms = STEP_MS
+    # the hand angle text changes every frame (6 surfaces) and the rotation
+    # cache may render one more angle
+    surface_budget = 7
+    assets = ("tiny_dungeon/tilemap_packed.png", "bitmap_font/kenney-pixel.png")
+
     def __init__(self):
         self.font = FontUtils()
         self.tile_size = (16, 16)
-        self.tile_size_scale = tuple([x * SCALE for x in list(self.tile_size)])
         self.screen = None
-        self.screen_size = (600, 400)
+        self.hud = None
+        self.screen_size = (WIDTH, HEIGHT)
 
-        self.wizard_group = pygame.sprite.Group()
-        self.potion_group = pygame.sprite.Group()
+        self.wizard_group = BatchedRenderUpdates()
+        self.potion_group = BatchedRenderUpdates()
         self.wizard = Wizard()
         self.potion = Potion()
         self.wizard_group.add(self.wizard)
         self.potion_group.add(self.potion)
+        self.tweens = Tweens()
+        self._hand = self.tweens.add(0, 360, HAND_PERIOD_MS, repeat=True)
         self.angle = 0
 
-    def calculate_angle(self, ticks):
-        # 60 secs per rotation, clockwise: -= (ticks/1000) * 2 * math.pi
-        SPEED = 10
-        self.angle += (ticks / 1000) * 2 * math.pi * SPEED
-        self.angle = self.angle % 360
+    def exit(self):
+        super().exit()
+        # the rotated frames are shared by every Potion, drop them with the scene
+        Potion.rotations = None
 
     def draw_text(self):
         screen_text_color = [
@@ -123,23 +153,18 @@ class WizardClock(BaseScene):
             f"Hand angle is currently {int(self.angle)}",
         ]
 
+        rects = []
         for indx, text in enumerate(screen_text_color):
-            self.screen.blit(
-                transform.scale_by(
-                    self.font.text_to_image_shadow_effect(text, TEXT_COLOR), TEXT_SCALE
-                ),
-                (
-                    PADDING * TEXT_SCALE,
-                    PADDING * TEXT_SCALE + LINE_HEIGHT * indx * TEXT_SCALE,
-                ),
+            rects.append(
+                self.hud.blit(
+                    self.font.text_surface(text, TEXT_COLOR),
+                    (PADDING, PADDING + LINE_HEIGHT * indx),
+                )
             )
+        return rects
 
-    def render(self, screen, clock, events, keys):
-        pygame.mouse.set_visible(True)
-        dt = clock.tick(FPS)
-        self.screen = screen
-        self.screen_size = screen.get_size()
-        self.calculate_angle(dt)
+    def update(self, dt, events, keys):
+        self.angle = self.tweens.value(self._hand)
 
         x, y = 0, 0
         if keys[pygame.K_UP] and not keys[pygame.K_DOWN]:
@@ -150,9 +175,20 @@ class WizardClock(BaseScene):
             x = -MOVEMENT_SPEED * dt
         elif keys[pygame.K_RIGHT] and not keys[pygame.K_LEFT]:
             x = MOVEMENT_SPEED * dt
+        PROFILER.lap("input")
 
         self.wizard_group.update(x, y, self.screen_size)
         self.potion_group.update(self.angle, self.wizard.rect.center)
-        self.wizard_group.draw(screen)
-        self.potion_group.draw(screen)
-        self.draw_text()
+        PROFILER.lap("update")
+
+    def draw(self, screen, alpha, hud=None, sprites=None):
+        pygame.mouse.set_visible(True)
+        self.screen = screen
+        self.hud = hud
+        self.screen_size = screen.get_size()
+
+        self.dirty_rects = self.wizard_group.draw(screen, alpha=alpha)
+        self.sprite_rects = self.potion_group.draw(sprites, alpha=alpha)
+        PROFILER.lap("draw")
+        self.hud_rects = self.draw_text()
+        PROFILER.lap("hud")
@@ -0,0 +1,245 @@
+import os
+import sys
+import types
+import weakref
+from collections import defaultdict, deque
+
+import numpy as np
+import pygame
+
+from utils.spritesheet_utils import SpritesheetRegistry
+
+# functions returning a newly allocated surface, unless given a destination
+TRANSFORMS = (
+    "scale",
+    "scale_by",
+    "smoothscale",
+    "smoothscale_by",
+    "rotate",
+    "rotozoom",
+    "flip",
+    "chop",
+    "grayscale",
+    "laplacian",
+)
+
+# the tracker surfaces and wrapped functions report to while installed
+_active = None
+
+
+def _record(surface, depth=2):
+    if _active is not None:
+        _active.record(surface, sys._getframe(depth))
+    return surface
+
+
+class _TrackedSurface(pygame.Surface):
+    """Stands in for `pygame.Surface` while tracking, so surfaces created
+    with the constructor, and copies and conversions of those, are counted"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _record(self)
+
+    def copy(self):
+        return _record(super().copy())
+
+    def convert(self, *args, **kwargs):
+        return _record(super().convert(*args, **kwargs))
+
+    def convert_alpha(self, *args, **kwargs):
+        return _record(super().convert_alpha(*args, **kwargs))
+
+
+def _tracked(function):
+    def wrapper(*args, **kwargs):
+        result = function(*args, **kwargs)
+        # a destination surface was passed in and filled, nothing was allocated
+        if not any(result is arg for arg in args + tuple(kwargs.values())):
+            _record(result)
+        return result
+
+    wrapper.__wrapped__ = function
+    return wrapper
+
+
+class SurfaceAllocations:
+    """Counts the surfaces, and their pixel bytes, allocated per call site.
+
+    While installed (`with SurfaceAllocations() as allocations:`) the
+    `pygame.Surface` constructor, `pygame.image.load` and the allocating
+    `pygame.transform` functions are wrapped, and every surface they return
+    is attributed to the line that called them. `copy`, `convert` and
+    `convert_alpha` are only counted on surfaces created with the
+    constructor while installed. Subsurfaces share their parent's pixels and
+    are not counted.
+
+    Call `end_frame` after every frame; `report` then gives the surfaces and
+    bytes per frame overall and for each call site.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.frame_surfaces = []
+        self.frame_bytes = []
+        # site -> [surfaces, bytes, frames allocating, most surfaces in a frame]
+        self.sites = defaultdict(lambda: [0, 0, 0, 0])
+        self._frame = defaultdict(lambda: [0, 0])
+        self._originals = {}
+
+    def record(self, surface, frame):
+        code = frame.f_code
+        site = f"{os.path.basename(code.co_filename)}:{frame.f_lineno} {code.co_name}"
+        entry = self._frame[site]
+        entry[0] += 1
+        entry[1] += surface.get_pitch() * surface.get_height()
+
+    def end_frame(self):
+        surfaces = allocated = 0
+        for site, (count, size) in self._frame.items():
+            totals = self.sites[site]
+            totals[0] += count
+            totals[1] += size
+            totals[2] += 1
+            totals[3] = max(totals[3], count)
+            surfaces += count
+            allocated += size
+        self._frame.clear()
+        self.frames += 1
+        self.frame_surfaces.append(surfaces)
+        self.frame_bytes.append(allocated)
+
+    def install(self):
+        global _active
+        if _active is not None:
+            raise RuntimeError("Surface allocations are already being tracked")
+        _active = self
+        self._originals = {(pygame, "Surface"): pygame.Surface}
+        self._originals[(pygame.image, "load")] = pygame.image.load
+        for name in TRANSFORMS:
+            if hasattr(pygame.transform, name):
+                self._originals[(pygame.transform, name)] = getattr(
+                    pygame.transform, name
+                )
+        for (module, name), original in self._originals.items():
+            if module is pygame:
+                setattr(module, name, _TrackedSurface)
+            else:
+                setattr(module, name, _tracked(original))
+
+    def uninstall(self):
+        global _active
+        for (module, name), original in self._originals.items():
+            setattr(module, name, original)
+        self._originals = {}
+        _active = None
+        # surfaces allocated after the last end_frame belong to no frame
+        self._frame.clear()
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.uninstall()
+
+    def report(self):
+        frames = max(self.frames, 1)
+        return {
+            "frames": self.frames,
+            "surfaces_per_frame_mean": sum(self.frame_surfaces) / frames,
+            "surfaces_per_frame_max": max(self.frame_surfaces, default=0),
+            "bytes_per_frame_mean": sum(self.frame_bytes) / frames,
+            "bytes_per_frame_max": max(self.frame_bytes, default=0),
+            "sites": {
+                site: {
+                    "surfaces": count,
+                    "bytes": size,
+                    "frames": seen,
+                    "surfaces_per_frame_max": most,
+                }
+                for site, (count, size, seen, most) in sorted(
+                    self.sites.items(), key=lambda item: -item[1][1]
+                )
+            },
+        }
+
+
+def _own_class(cls):
+    """Whether `cls` belongs to this project, rather than pygame or Python"""
+    package = cls.__module__.partition(".")[0]
+    return package not in sys.stdlib_module_names and package not in (
+        "builtins",
+        "pygame",
+        "numpy",
+    )
+
+
+def resident_memory(root):
+    """Counts the surfaces, sounds and arrays reachable from `root`.
+
+    Follows the attributes of objects, including the class attributes of this
+    project's classes (e.g. caches shared by every sprite), and the contents
+    of containers and sprite groups. Subsurfaces are counted but add no
+    bytes, they share their parent's pixels. Assets shared with other scenes
+    are counted in full for each of them.
+
+    The spritesheet registry is not followed, it caches the sheets of every
+    scene: only the sheets and tiles `root` holds through its
+    `SpritesheetUtils` are counted.
+    """
+    totals = {
+        "surfaces": 0,
+        "surface_bytes": 0,
+        "sounds": 0,
+        "sound_bytes": 0,
+        "arrays": 0,
+        "array_bytes": 0,
+    }
+    mixer = pygame.mixer.get_init()
+    seen = set()
+    stack = [root]
+    while stack:
+        value = stack.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        if isinstance(value, pygame.Surface):
+            totals["surfaces"] += 1
+            if value.get_parent() is None:
+                totals["surface_bytes"] += value.get_pitch() * value.get_height()
+        elif isinstance(value, pygame.mixer.Sound):
+            totals["sounds"] += 1
+            if mixer is not None:
+                frequency, size, channels = mixer
+                totals["sound_bytes"] += int(
+                    value.get_length() * frequency * channels * abs(size) // 8
+                )
+        elif isinstance(value, np.ndarray):
+            totals["arrays"] += 1
+            totals["array_bytes"] += value.nbytes
+        elif isinstance(value, dict):
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple, set, frozenset, deque)):
+            stack.extend(value)
+        elif isinstance(value, pygame.sprite.AbstractGroup):
+            stack.extend(value.sprites())
+        elif isinstance(
+            value,
+            (
+                type,
+                types.ModuleType,
+                types.FunctionType,
+                types.MethodType,
+                SpritesheetRegistry,
+                weakref.finalize,
+            ),
+        ):
+            continue
+        elif hasattr(value, "__dict__"):
+            stack.extend(vars(value).values())
+            for cls in type(value).__mro__:
+                if _own_class(cls):
+                    stack.extend(vars(cls).values())
+    return totals
@@ -0,0 +1,154 @@
+from enum import Enum
+
+from pygame import transform
+
+
+class AnimationMode(Enum):
+    LOOP = 0
+    PING_PONG = 1
+    ONE_SHOT = 2
+
+
+class Animation:
+    """Frames shown `frame_ms` each, played on a time base by an `Animator`.
+
+    An animation is a definition shared by every sprite playing it, its
+    frames must be treated as read-only. `LOOP` starts over after the last
+    frame, `PING_PONG` plays back and forth, and `ONE_SHOT` stops on the last
+    frame.
+    """
+
+    def __init__(self, frames, frame_ms, mode=AnimationMode.LOOP):
+        self.frames = list(frames)
+        self.frame_ms = frame_ms
+        self.mode = mode
+
+    def index_at(self, elapsed):
+        """The frame shown `elapsed` ms after the animation started"""
+        step = int(elapsed // self.frame_ms)
+        count = len(self.frames)
+        if self.mode is AnimationMode.ONE_SHOT:
+            return min(step, count - 1)
+        if self.mode is AnimationMode.LOOP:
+            return step % count
+        period = max(2 * count - 2, 1)
+        step %= period
+        return step if step < count else period - step
+
+    def finished(self, elapsed):
+        """Whether a one shot animation has reached its last frame"""
+        return (
+            self.mode is AnimationMode.ONE_SHOT
+            and elapsed >= (len(self.frames) - 1) * self.frame_ms
+        )
+
+
+def strip_animation(
+    ss, rect, image_count, frame_ms, mode=AnimationMode.LOOP, scale=1, reverse=False
+):
+    """An `Animation` of a strip of `ss` (see `SpritesheetUtils.load_strip`).
+
+    The frames are scaled once, and the animation is shared by everything
+    asking for the same strip and arguments until the sheet is evicted, so
+    sprites playing it can be grouped by `Animator`. A `reverse` animation
+    shares the frames of the forward one.
+    """
+
+    def build():
+        if reverse:
+            forward = strip_animation(ss, rect, image_count, frame_ms, mode, scale)
+            return Animation(forward.frames[::-1], frame_ms, mode)
+        frames = ss.load_strip(rect, image_count)
+        if scale != 1:
+            frames = [transform.scale_by(frame, scale) for frame in frames]
+        return Animation(frames, frame_ms, mode)
+
+    options = ("animation", tuple(rect), image_count, frame_ms, mode, scale, reverse)
+    return ss.shared(options, build)
+
+
+class Track:
+    """One animation started at one time, and the sprites playing it"""
+
+    def __init__(self, animation, start):
+        self.animation = animation
+        self.start = start
+        self.index = None
+        # sprite -> (on_finish, args)
+        self.sprites = {}
+
+    def advance(self, now):
+        """Shows the frame due at `now`, returns whether a one shot finished"""
+        elapsed = now - self.start
+        index = self.animation.index_at(elapsed)
+        if index != self.index:
+            self.index = index
+            frame = self.animation.frames[index]
+            for sprite in self.sprites:
+                sprite.image = frame
+        return self.animation.finished(elapsed)
+
+
+class Animator:
+    """Plays animations on the sprites of a scene.
+
+    Sprites playing the same animation, started on the same step, share a
+    `Track`: the frame due is worked out once per track per step, and only
+    assigned to the sprites' `image` when it changes. `BaseScene` calls
+    `update(now)` before every simulation step, with the scene's simulated
+    time (see `BaseScene.time`); `play` starts from the `now` of the last update. When a one shot
+    animation reaches its last frame the sprite keeps showing it, and its
+    `on_finish(*args)` is called.
+    """
+
+    def __init__(self, now=0):
+        self.now = now
+        self._tracks = {}
+        # sprite -> the track it plays
+        self._playing = {}
+
+    def play(self, sprite, animation, on_finish=None, *args):
+        self.stop(sprite)
+        key = (animation, self.now)
+        track = self._tracks.get(key)
+        if track is None:
+            track = self._tracks[key] = Track(animation, self.now)
+            track.index = animation.index_at(0)
+        track.sprites[sprite] = (on_finish, args)
+        self._playing[sprite] = track
+        sprite.image = animation.frames[track.index]
+
+    def stop(self, sprite):
+        """Stops animating `sprite`, which keeps its current frame"""
+        track = self._playing.pop(sprite, None)
+        if track is None:
+            return
+        del track.sprites[sprite]
+        if not track.sprites:
+            del self._tracks[(track.animation, track.start)]
+
+    def playing(self, sprite):
+        track = self._playing.get(sprite)
+        return None if track is None else track.animation
+
+    def update(self, now):
+        self.now = now
+        finished = [track for track in self._tracks.values() if track.advance(now)]
+        # every finished sprite is removed before any callback runs, callbacks
+        # may play or stop other sprites
+        callbacks = []
+        for track in finished:
+            del self._tracks[(track.animation, track.start)]
+            for sprite in track.sprites:
+                del self._playing[sprite]
+            callbacks.extend(track.sprites.values())
+        for on_finish, args in callbacks:
+            if on_finish is not None:
+                on_finish(*args)
+
+    def clear(self):
+        self._tracks.clear()
+        self._playing.clear()
+
+    def __len__(self):
+        return len(self._tracks)
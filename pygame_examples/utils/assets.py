@@ -0,0 +1,107 @@
+import asyncio
+import weakref
+from pathlib import Path
+from time import perf_counter
+
+import pygame
+
+from utils.spritesheet_utils import BASE_ASSET_PATH, SPRITESHEET_REGISTRY
+from utils.startup import STARTUP
+
+
+class SoundCache:
+    """Shares decoded sounds across all callers.
+
+    Sounds are held weakly, so each is decoded once while anything holds it
+    and freed with the scene that used it. The shared sounds' volume is
+    shared too.
+    """
+
+    def __init__(self):
+        self._sounds = weakref.WeakValueDictionary()
+
+    def load(self, filename):
+        filename = str(filename)
+        sound = self._sounds.get(filename)
+        if sound is None:
+            with STARTUP.measure(f"decode {Path(filename).name}"):
+                sound = self._sounds[filename] = pygame.mixer.Sound(filename)
+        return sound
+
+    def loaded(self, filename):
+        return str(filename) in self._sounds
+
+    def __len__(self):
+        return len(self._sounds)
+
+
+SOUND_CACHE = SoundCache()
+
+
+class AssetLoader:
+    """Decodes a scene's assets ahead of constructing it, a slice at a time.
+
+    `queue` takes asset names relative to the assets folder, e.g. a scene's
+    `assets`. `load` decodes them into the shared caches one at a time, and
+    once `slice_ms` has passed hands control back to the event loop with
+    `await asyncio.sleep(0)`, after calling `on_progress` to e.g. draw a
+    loading screen. Under pygbag this keeps the browser tab responsive; a
+    load shorter than one slice never yields and shows nothing.
+
+    Decoded sounds are held until `release`, so that they are still cached
+    when the scene that needs them is constructed.
+    """
+
+    def __init__(
+        self, slice_ms=8, spritesheets=SPRITESHEET_REGISTRY, sounds=SOUND_CACHE
+    ):
+        self.slice_ms = slice_ms
+        self.spritesheets = spritesheets
+        self.sounds = sounds
+        self.pending = []
+        self.total = 0
+        self.done = 0
+        self._held = []
+
+    @property
+    def progress(self):
+        return self.done / self.total if self.total else 1.0
+
+    def queue(self, names):
+        for name in names:
+            path = BASE_ASSET_PATH.joinpath(name)
+            if path not in self.pending and not self._loaded(path):
+                self.pending.append(path)
+                self.total += 1
+
+    def _loaded(self, path):
+        if path.suffix == ".ogg":
+            return self.sounds.loaded(path)
+        return self.spritesheets.loaded(path)
+
+    def _decode(self, path):
+        if path.suffix == ".ogg":
+            self._held.append(self.sounds.load(path))
+        else:
+            self.spritesheets.preload(path)
+
+    async def load(self, on_progress=None):
+        """Decodes everything queued, returns how many assets were decoded"""
+        decoded = 0
+        slice_start = perf_counter()
+        while self.pending:
+            self._decode(self.pending.pop(0))
+            self.done += 1
+            decoded += 1
+            elapsed_ms = (perf_counter() - slice_start) * 1000
+            if self.pending and elapsed_ms >= self.slice_ms:
+                if on_progress is not None:
+                    on_progress(self.progress)
+                await asyncio.sleep(0)
+                slice_start = perf_counter()
+        self.total = self.done = 0
+        return decoded
+
+    def release(self):
+        """Stops holding the decoded sounds, once their scene holds them"""
+        self._held = []
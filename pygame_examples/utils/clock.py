@@ -0,0 +1,58 @@
+import pygame
+
+
+class RealClock:
+    """Wall clock time, frames are paced in real time.
+
+    Clocks stand in for `pygame.time.Clock` in `utils.scheduler.FrameScheduler`:
+    `tick(framerate)` ends a frame and returns its dt in ms. That dt is all
+    scenes get from a clock: their cooldowns and animations run on the time
+    their fixed steps add up to (see `BaseScene.time`), so a virtual clock
+    changes how fast game time passes, not what happens in it.
+    """
+
+    def __init__(self):
+        self._clock = pygame.time.Clock()
+
+    def tick(self, framerate=0):
+        return self._clock.tick(framerate)
+
+    def get_fps(self):
+        return self._clock.get_fps()
+
+
+class FixedStepClock:
+    """Virtual time, advancing exactly `step_ms` every frame.
+
+    Frames are still paced in real time, but the dt scenes are given no
+    longer depends on how long a frame took, so runs with the same input are
+    repeatable.
+    """
+
+    # wait out the rest of each frame like the real clock
+    pace = True
+
+    def __init__(self, step_ms=1000 / 60):
+        self.step_ms = step_ms
+        self._clock = pygame.time.Clock()
+
+    def tick(self, framerate=0):
+        self._clock.tick(framerate if self.pace else 0)
+        return self.step_ms
+
+    def get_fps(self):
+        return self._clock.get_fps()
+
+
+class TurboClock(FixedStepClock):
+    """Virtual time like `FixedStepClock`, without ever waiting.
+
+    Frames run as fast as the scene can simulate and draw them, which under
+    the dummy drivers is thousands per second, so soak tests and long
+    benchmarks cover minutes of game time in seconds.
+    """
+
+    pace = False
+
+
+CLOCKS = {"real": RealClock, "fixed": FixedStepClock, "turbo": TurboClock}
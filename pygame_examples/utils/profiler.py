@@ -0,0 +1,147 @@
+from collections import deque
+from time import perf_counter
+
+import pygame
+
+from common import CRUST_COLOR, GREEN_COLOR, RED_COLOR, TEXT_COLOR, YELLOW_COLOR
+from utils.spritesheet_utils import FontUtils
+
+
+class FrameProfiler:
+    """Times the phases of each frame and draws them as a debug overlay.
+
+    The main loop calls `begin_frame` once per frame, and `lap(name)` at the
+    end of each phase, both there and inside scene `render` methods. A lap
+    adds the time since the previous lap to that phase, so a frame is split
+    into consecutive phases without wrapping any code. While disabled, both
+    calls return straight away. `record()` times the phases without showing
+    the overlay, for `TelemetryRecorder` to read them from `current`.
+
+    `draw` renders the rolling average of every phase over the last `window`
+    frames and a graph of frame times against the 60 fps budget. Time spent
+    in the `idle_phase` (waiting for the next frame) does not count against
+    the budget.
+    """
+
+    def __init__(
+        self, window=120, budget_ms=1000 / 60, refresh_ms=250, idle_phase="wait"
+    ):
+        self.enabled = False
+        self.recording = False
+        self.active = False
+        self.idle_phase = idle_phase
+        self.window = window
+        self.budget_ms = budget_ms
+        self.refresh_ms = refresh_ms
+        self.font = None
+        self._current = {}
+        self._frame_start = None
+        self._last = None
+        self._reset()
+
+    def _reset(self):
+        self.frame_times = deque(maxlen=self.window)
+        self.phases = {}
+        self._lines = []
+        self._refreshed = None
+
+    def _set(self, enabled, recording):
+        active = enabled or recording
+        if active and not self.active:
+            # the next lap would otherwise include the time spent inactive
+            self._current = {}
+            self._frame_start = self._last = None
+        self.enabled, self.recording, self.active = enabled, recording, active
+
+    def toggle(self):
+        self._set(not self.enabled, self.recording)
+        self._reset()
+
+    def record(self, recording=True):
+        self._set(self.enabled, recording)
+
+    def begin_frame(self):
+        if not self.active:
+            return
+        now = perf_counter()
+        if self._frame_start is not None:
+            self.frame_times.append(
+                (now - self._frame_start) * 1000
+                - self._current.get(self.idle_phase, 0)
+            )
+            for name, ms in self._current.items():
+                if name not in self.phases:
+                    self.phases[name] = deque(maxlen=self.window)
+                self.phases[name].append(ms)
+        self._current = {}
+        self._frame_start = self._last = now
+
+    def lap(self, name):
+        if not self.active or self._last is None:
+            return
+        now = perf_counter()
+        self._current[name] = self._current.get(name, 0) + (now - self._last) * 1000
+        self._last = now
+
+    def current(self):
+        """The phases timed so far this frame, in ms"""
+        return self._current
+
+    def averages(self):
+        return {name: sum(times) / len(times) for name, times in self.phases.items()}
+
+    def _text_lines(self):
+        frame_ms = sum(self.frame_times) / max(len(self.frame_times), 1)
+        lines = [
+            (
+                f"busy    {frame_ms:5.1f}ms",
+                RED_COLOR if frame_ms > self.budget_ms else TEXT_COLOR,
+            )
+        ]
+        lines += [
+            (f"{name[:8]:<8}{ms:5.1f}ms", TEXT_COLOR)
+            for name, ms in self.averages().items()
+        ]
+        return lines
+
+    def draw(self, surface):
+        """Draws the overlay in the top right corner, returns its rect"""
+        if self.font is None:
+            self.font = FontUtils()
+        # the numbers are only re-rendered every refresh_ms to stay readable
+        now = pygame.time.get_ticks()
+        if self._refreshed is None or now - self._refreshed >= self.refresh_ms:
+            self._lines = [
+                self.font.text_surface(text, color)
+                for text, color in self._text_lines()
+            ]
+            self._refreshed = now
+
+        graph_height = 32
+        width = max([line.get_width() for line in self._lines] + [self.window]) + 4
+        line_height = self.font.bitmap_size[1]
+        height = len(self._lines) * line_height + graph_height + 6
+        rect = pygame.Rect(surface.get_width() - width - 2, 2, width, height)
+        surface.fill(CRUST_COLOR, rect)
+        for index, line in enumerate(self._lines):
+            surface.blit(line, (rect.x + 2, rect.y + 2 + index * line_height))
+
+        # one bar per frame, the budget sits half way up the graph
+        graph_bottom = rect.bottom - 2
+        scale = graph_height / (2 * self.budget_ms)
+        for index, ms in enumerate(self.frame_times):
+            bar = min(int(ms * scale), graph_height)
+            color = RED_COLOR if ms > self.budget_ms else GREEN_COLOR
+            x = rect.x + 2 + index
+            pygame.draw.line(surface, color, (x, graph_bottom), (x, graph_bottom - bar))
+        budget_y = graph_bottom - int(self.budget_ms * scale)
+        pygame.draw.line(
+            surface,
+            YELLOW_COLOR,
+            (rect.x + 2, budget_y),
+            (rect.x + 2 + self.window, budget_y),
+        )
+        return rect
+
+
+PROFILER = FrameProfiler()
@@ -0,0 +1,295 @@
+import pygame
+from pygame import transform
+
+from utils.timestep import drawn_rect
+
+
+def to_logical(position, pixel_scale):
+    """Maps a screen position (e.g. the mouse) onto a scene's logical surface"""
+    return (position[0] // pixel_scale, position[1] // pixel_scale)
+
+
+def _by_image(pair):
+    return id(pair[0])
+
+
+def blit_batch(surface, pairs, sort=True, rects=True):
+    """Blits (image, position) pairs in a single call.
+
+    With `sort` the pairs are grouped by source image, which keeps the same
+    pixels hot in cache but changes the order overlapping images are drawn
+    in. Returns the blitted rects; with `rects=False` nothing is returned and
+    `Surface.fblits` is used where available (pygame-ce, e.g. under pygbag).
+    """
+    if sort:
+        pairs = sorted(pairs, key=_by_image)
+    if not rects and hasattr(surface, "fblits"):
+        surface.fblits(pairs)
+        return []
+    return surface.blits(pairs, doreturn=rects) or []
+
+
+class BatchedRenderUpdates(pygame.sprite.RenderUpdates):
+    """RenderUpdates that draws all its sprites with one `blits` call.
+
+    Sprites are drawn grouped by image, so sprites overlapping each other
+    should share an image or live in separate groups. With an `alpha`,
+    `InterpolatedSprite`s are drawn that far between their last two steps.
+    """
+
+    def draw(self, surface, bgsurf=None, special_flags=0, alpha=None):
+        sprites = sorted(self.sprites(), key=lambda sprite: id(sprite.image))
+        new_rects = surface.blits(
+            [
+                (sprite.image, drawn_rect(sprite, alpha), None, special_flags)
+                for sprite in sprites
+            ]
+        )
+
+        dirty = self.lostsprites
+        self.lostsprites = []
+        for sprite, new_rect in zip(sprites, new_rects):
+            old_rect = self.spritedict[sprite]
+            if old_rect:
+                if new_rect.colliderect(old_rect):
+                    dirty.append(new_rect.union(old_rect))
+                else:
+                    dirty.append(new_rect)
+                    dirty.append(old_rect)
+            else:
+                dirty.append(new_rect)
+            self.spritedict[sprite] = new_rect
+        return dirty
+
+
+def _covering(rect, scale):
+    """The rect of a surface `scale` times smaller covering the screen `rect`"""
+    left, top = rect.x // scale, rect.y // scale
+    right, bottom = -(-rect.right // scale), -(-rect.bottom // scale)
+    return pygame.Rect(left, top, right - left, bottom - top)
+
+
+class Framebuffer:
+    """Low resolution render target that is upscaled once when presenting.
+
+    Scenes with a `pixel_scale` above 1 draw unscaled (or less scaled) tiles
+    onto a logical surface of `screen size / pixel_scale`, which is then
+    scaled onto the screen with nearest neighbour sampling. This produces the
+    same pixel art while blitting and storing up to `pixel_scale ** 2` times
+    fewer pixels per sprite. With a `pixel_scale` of 1 the screen is drawn to
+    directly. Where the screen size is not a multiple of the scale, the
+    margin left over is filled with the background.
+
+    Scenes with a `hud_scale` also draw onto `hud`, a layer `hud_scale` times
+    smaller than the screen which is upscaled over the world, so e.g. text
+    drawn at 2x sits over a world drawn at 6x without either being
+    prescaled. Scenes with a `sprite_scale` draw sprites that would lose
+    detail at `pixel_scale`, such as rotated ones, onto `sprites`, a layer
+    between the world and the HUD. These layers are transparent where
+    nothing was drawn. Layers with the same scale are the same surface, so
+    e.g. with the same `hud_scale` as `pixel_scale`, `hud` is the world
+    surface itself.
+
+    With `dirty_rects` enabled, scenes that report the rects they drew (see
+    `BaseScene.dirty_rects`, `BaseScene.sprite_rects` and
+    `BaseScene.hud_rects`) only have last frame's rects cleared, and only
+    last and this frame's rects are upscaled and presented. Scenes that do
+    not report rects, and the first frame after `invalidate`, are redrawn
+    and presented in full. So are frames with more than `max_dirty_rects`
+    rects, where one full upscale is cheaper than many small ones.
+    """
+
+    # the colour that is transparent on the layers over the world
+    OVERLAY_COLORKEY = (255, 0, 255)
+
+    def __init__(
+        self, screen, background=(0, 0, 0), dirty_rects=False, max_dirty_rects=256
+    ):
+        self.screen = screen
+        self.background = background
+        self.dirty_rects = dirty_rects
+        self.max_dirty_rects = max_dirty_rects
+        self.pixel_scale = 1
+        self.sprite_scale = None
+        self.hud_scale = None
+        self.sprites = None
+        self.hud = None
+        self._surfaces = {}
+        self._overlays = {}
+        # scales of the layers drawn over the world, bottom first
+        self._overlay_scales = []
+        # overlays are scaled here before being blitted over the world, as
+        # scaling straight onto the screen would not skip transparent pixels
+        self._scratch = None
+        # rects drawn last frame, by layer scale, None when the whole frame
+        # has to be redrawn
+        self._previous = None
+
+    def invalidate(self):
+        """Forces the next frame to be cleared and presented in full"""
+        self._previous = None
+
+    def _layer(self, layers, scale):
+        if scale not in layers:
+            width, height = self.screen.get_size()
+            layers[scale] = pygame.Surface(
+                (width // scale, height // scale)
+            ).convert()
+        return layers[scale]
+
+    def _clear(self, surface, scale, color):
+        if self.dirty_rects and self._previous is not None:
+            for rect in self._previous[scale]:
+                surface.fill(color, rect)
+        else:
+            surface.fill(color)
+
+    def begin(self, pixel_scale=1, hud_scale=None, sprite_scale=None):
+        """Returns the cleared surface the next frame should be drawn onto.
+
+        With a `sprite_scale` or `hud_scale`, the cleared layers are then
+        `sprites` and `hud`.
+        """
+        if pixel_scale == 1 and {sprite_scale, hud_scale} - {None, 1}:
+            raise ValueError("Layers need the world drawn at a pixel_scale")
+        if (pixel_scale, sprite_scale, hud_scale) != (
+            self.pixel_scale,
+            self.sprite_scale,
+            self.hud_scale,
+        ):
+            self.invalidate()
+        self.pixel_scale = pixel_scale
+        self.sprite_scale = sprite_scale
+        self.hud_scale = hud_scale
+        if pixel_scale == 1:
+            surface = self.screen
+        else:
+            surface = self._layer(self._surfaces, pixel_scale)
+        self._clear(surface, pixel_scale, self.background)
+
+        layers = {pixel_scale: surface}
+        self._overlay_scales = []
+        for scale in (sprite_scale, hud_scale):
+            if scale is None or scale in layers:
+                continue
+            layers[scale] = self._layer(self._overlays, scale)
+            layers[scale].set_colorkey(self.OVERLAY_COLORKEY)
+            self._clear(layers[scale], scale, self.OVERLAY_COLORKEY)
+            self._overlay_scales.append(scale)
+        self.sprites = layers.get(sprite_scale)
+        self.hud = layers.get(hud_scale)
+        return surface
+
+    def _upscale(self, rect):
+        """Scales a logical rect onto the screen, returns the screen rect"""
+        scale = self.pixel_scale
+        screen_rect = pygame.Rect(
+            rect.x * scale, rect.y * scale, rect.w * scale, rect.h * scale
+        )
+        if scale != 1:
+            # scale straight into the screen, no intermediate surface is allocated
+            transform.scale(
+                self._surfaces[scale].subsurface(rect),
+                screen_rect.size,
+                self.screen.subsurface(screen_rect),
+            )
+        return screen_rect
+
+    def _fill_margins(self, area):
+        """Fills what `area` covers of the screen the world does not reach"""
+        if self.pixel_scale == 1:
+            return
+        world = self._surfaces[self.pixel_scale]
+        right = world.get_width() * self.pixel_scale
+        bottom = world.get_height() * self.pixel_scale
+        width, height = self.screen.get_size()
+        for margin in (
+            pygame.Rect(right, 0, width - right, height),
+            pygame.Rect(0, bottom, width, height - bottom),
+        ):
+            margin = margin.clip(area)
+            if margin.w and margin.h:
+                self.screen.fill(self.background, margin)
+
+    def _composite(self, rect, scale):
+        """Scales an overlay rect over the screen, returns the screen rect"""
+        screen_rect = pygame.Rect(
+            rect.x * scale, rect.y * scale, rect.w * scale, rect.h * scale
+        )
+        overlay = self._overlays[scale]
+        if scale == 1:
+            self.screen.blit(overlay, screen_rect, screen_rect)
+            return screen_rect
+        if self._scratch is None:
+            self._scratch = pygame.Surface(self.screen.get_size()).convert()
+            self._scratch.set_colorkey(self.OVERLAY_COLORKEY)
+        transform.scale(
+            overlay.subsurface(rect),
+            screen_rect.size,
+            self._scratch.subsurface(screen_rect),
+        )
+        self.screen.blit(self._scratch, screen_rect, screen_rect)
+        return screen_rect
+
+    def _redraw(self, screen_rect):
+        """Presents the layers covering a screen rect, returns the rect redrawn"""
+        if self.pixel_scale == 1:
+            area = screen_rect
+        else:
+            world = _covering(screen_rect, self.pixel_scale).clip(
+                self._surfaces[self.pixel_scale].get_rect()
+            )
+            area = screen_rect
+            if world.w and world.h:
+                area = self._upscale(world).union(screen_rect)
+            self._fill_margins(area)
+        for scale in self._overlay_scales:
+            rect = _covering(area, scale).clip(self._overlays[scale].get_rect())
+            if rect.w and rect.h:
+                area = self._composite(rect, scale).union(area)
+        return area
+
+    def present(self, dirty_rects=None, hud_rects=None, sprite_rects=None):
+        """Upscales the frame onto the screen and presents it, once"""
+        # the rects drawn on each layer, layers with the same scale are one
+        drawn = {}
+        for scale, rects in (
+            (self.pixel_scale, dirty_rects),
+            (self.sprite_scale, sprite_rects),
+            (self.hud_scale, hud_rects),
+        ):
+            if scale is None:
+                continue
+            if rects is None or drawn.get(scale, []) is None:
+                drawn[scale] = None
+            else:
+                drawn[scale] = drawn.get(scale, []) + list(rects)
+
+        partial = (
+            self.dirty_rects
+            and None not in drawn.values()
+            and sum(len(rects) for rects in drawn.values()) <= self.max_dirty_rects
+        )
+        if not partial or self._previous is None:
+            self._redraw(self.screen.get_rect())
+            pygame.display.flip()
+        else:
+            screen = self.screen.get_rect()
+            rects = [
+                pygame.Rect(
+                    rect.x * scale, rect.y * scale, rect.w * scale, rect.h * scale
+                ).clip(screen)
+                for scale, layer_rects in drawn.items()
+                for rect in self._previous[scale] + layer_rects
+            ]
+            pygame.display.update(
+                [self._redraw(rect) for rect in rects if rect.w and rect.h]
+            )
+
+        if partial:
+            self._previous = {
+                scale: [pygame.Rect(rect) for rect in rects]
+                for scale, rects in drawn.items()
+            }
+        else:
+            self.invalidate()
@@ -0,0 +1,59 @@
+import pygame
+from pygame import transform
+
+
+class RotationCache:
+    """Rotated copies of an image at quantized angles.
+
+    Angles are snapped to `steps` evenly spaced values and each rotation is
+    rendered once (lazily, or all at once via `prerender`), so rotating a
+    sprite every frame becomes a table lookup. The returned surfaces are
+    shared and must be treated as read-only.
+
+    `pivot` is the point of the unrotated image, relative to its top left,
+    that stays fixed while rotating; it defaults to the image center.
+    """
+
+    def __init__(self, image, steps=360, pivot=None):
+        self.image = image
+        self.steps = steps
+        rect = image.get_rect()
+        pivot = rect.center if pivot is None else pivot
+        self.pivot_offset = pygame.math.Vector2(pivot) - pygame.math.Vector2(
+            rect.center
+        )
+        self._frames = [None] * steps
+
+    def index(self, angle):
+        return round((angle % 360) * self.steps / 360) % self.steps
+
+    def angle_at(self, index):
+        return index * 360 / self.steps
+
+    def _render(self, index):
+        angle = self.angle_at(index)
+        image = transform.rotate(self.image, angle)
+        # where the image center ends up relative to the pivot after rotating
+        offset = -self.pivot_offset.rotate(-angle)
+        self._frames[index] = (image, (offset.x, offset.y))
+        return self._frames[index]
+
+    def frame(self, angle):
+        """Returns the rotated image and its center offset from the pivot"""
+        index = self.index(angle)
+        return self._frames[index] or self._render(index)
+
+    def rotate(self, angle, position):
+        """Returns the rotated image and a rect placing its pivot at `position`"""
+        image, offset = self.frame(angle)
+        rect = image.get_rect(center=(position[0] + offset[0], position[1] + offset[1]))
+        return image, rect
+
+    def prerender(self):
+        for index in range(self.steps):
+            if self._frames[index] is None:
+                self._render(index)
+        return self
+
+    def __len__(self):
+        return sum(frame is not None for frame in self._frames)
@@ -0,0 +1,225 @@
+"""
+Profiling captures of the running game, split by scene.
+
+    cd pygame_examples && python main.py --profile
+
+Press F5 to start a capture and F5 again to stop it. Every capture writes one
+file per scene it saw into `--profile-dir`: collapsed stacks (for
+flamegraph.pl or speedscope) and a speedscope JSON profile with the sampling
+profiler, or a pstats dump (for snakeviz or `python -m pstats`) with
+`--profile cprofile`.
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+from collections import defaultdict
+from time import perf_counter
+
+
+class StackSampler:
+    """Samples the call stack of one thread from a background thread.
+
+    Every `interval` seconds the sampler reads the stack of the profiled
+    thread and adds the time since the previous sample to that stack, under
+    the current `scene`. Nothing runs on the profiled thread itself, so the
+    overhead is a short GIL hold per sample. The profiled thread only gets
+    sampled when it gives up the GIL, at most every `sys.getswitchinterval()`
+    while it is busy.
+    """
+
+    def __init__(self, interval=0.001, thread_id=None):
+        self.interval = interval
+        if thread_id is None:
+            thread_id = threading.main_thread().ident
+        self.thread_id = thread_id
+        self.scene = None
+        # scene -> stack -> [samples, ms]
+        self.stacks = defaultdict(lambda: defaultdict(lambda: [0, 0.0]))
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        last = perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = perf_counter()
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            stack.reverse()
+            entry = self.stacks[self.scene][tuple(stack)]
+            entry[0] += 1
+            entry[1] += (now - last) * 1000
+            last = now
+
+
+def frame_name(frame):
+    name, filename, line = frame
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def collapsed(stacks):
+    """Brendan Gregg's collapsed stack format, one `a;b;c samples` per line"""
+    return "".join(
+        ";".join(frame_name(frame) for frame in stack) + f" {samples}\n"
+        for stack, (samples, _) in stacks.items()
+    )
+
+
+def speedscope(stacks, name):
+    """A speedscope sampled profile, weighted by the ms between samples"""
+    frames = {}
+    samples = []
+    weights = []
+    for stack, (_, ms) in stacks.items():
+        samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+        weights.append(round(ms, 3))
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "pygame-examples",
+        "shared": {
+            "frames": [
+                {"name": frame[0], "file": frame[1], "line": frame[2]}
+                for frame in frames
+            ]
+        },
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": samples,
+                "weights": weights,
+            }
+        ],
+    }
+
+
+class ProfileCapture:
+    """Profiles the sections of a run between `toggle` calls, per scene.
+
+    The main loop calls `frame(scene)` once per frame with the name of the
+    active scene. With `mode="sample"` a `StackSampler` attributes samples to
+    that scene; with `mode="cprofile"` every scene gets its own
+    `cProfile.Profile`, enabled only while that scene is active. A capture
+    with a `max_frames` stops itself after that many frames, which keeps
+    cProfile's overhead to a bounded window.
+    """
+
+    def __init__(self, mode="sample", directory="profiles", max_frames=None):
+        if mode not in ("sample", "cprofile"):
+            raise ValueError(f"Unknown profile mode {mode!r}")
+        self.mode = mode
+        self.directory = directory
+        self.max_frames = max_frames
+        self.captures = 0
+        self._running = False
+        self._frames = 0
+        self._scene = None
+        self._sampler = None
+        self._profiles = {}
+
+    @property
+    def running(self):
+        return self._running
+
+    def toggle(self):
+        """Starts or stops a capture, returns the paths written when stopping"""
+        if self._running:
+            return self.stop()
+        self.start()
+        return []
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._frames = 0
+        self._scene = None
+        if self.mode == "sample":
+            self._sampler = StackSampler()
+            self._sampler.start()
+        else:
+            self._profiles = {}
+
+    def frame(self, scene):
+        """Returns the paths written when the capture stopped itself"""
+        if not self._running:
+            return ()
+        if self.max_frames is not None and self._frames >= self.max_frames:
+            return self.stop()
+        self._frames += 1
+        if scene == self._scene:
+            return ()
+        if self.mode == "sample":
+            self._sampler.scene = scene
+        else:
+            if self._scene is not None:
+                self._profiles[self._scene].disable()
+            if scene not in self._profiles:
+                self._profiles[scene] = cProfile.Profile()
+            self._profiles[scene].enable()
+        self._scene = scene
+        return ()
+
+    def stop(self):
+        """Stops the capture and writes it out, returns the written paths"""
+        if not self._running:
+            return []
+        self._running = False
+        self.captures += 1
+        os.makedirs(self.directory, exist_ok=True)
+        prefix = os.path.join(self.directory, f"{self.captures:02d}")
+
+        paths = []
+        if self.mode == "sample":
+            self._sampler.stop()
+            for scene, stacks in self._sampler.stacks.items():
+                if scene is None:
+                    continue
+                path = f"{prefix}-{scene}.collapsed.txt"
+                with open(path, "w") as f:
+                    f.write(collapsed(stacks))
+                paths.append(path)
+                path = f"{prefix}-{scene}.speedscope.json"
+                with open(path, "w") as f:
+                    json.dump(speedscope(stacks, f"{scene} #{self.captures}"), f)
+                paths.append(path)
+            self._sampler = None
+        else:
+            if self._scene is not None:
+                self._profiles[self._scene].disable()
+            for scene, profile in self._profiles.items():
+                path = f"{prefix}-{scene}.prof"
+                profile.dump_stats(path)
+                paths.append(path)
+            self._profiles = {}
+        return paths
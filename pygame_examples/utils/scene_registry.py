@@ -0,0 +1,193 @@
+import importlib
+from time import perf_counter
+
+from utils.allocations import resident_memory
+from utils.spritesheet_utils import SPRITESHEET_REGISTRY
+from utils.startup import STARTUP
+
+
+def scene_class(module, name):
+    """Imports `module` and returns its class `name`"""
+    return getattr(importlib.import_module(module), name)
+
+
+class SceneRegistry:
+    """Constructs scenes on first selection instead of all up front.
+
+    Scenes are registered by key (a `TitleMenuEnum`) with the module that
+    defines them, and neither imported nor constructed until `get` is first
+    called for that key, so only the first scene's assets are loaded before
+    the first frame. `prewarm` queues scenes to be constructed ahead of time,
+    one per `prewarm_step`, which the main loop calls once per frame.
+    """
+
+    def __init__(self, modules=None, timer=STARTUP):
+        self.timer = timer
+        self._modules = {}
+        # imported once, so the import is only measured the first time
+        self._classes = {}
+        self._scenes = {}
+        self._prewarm = []
+        # ms each scene took to import and construct
+        self.construct_ms = {}
+        for key, module in (modules or {}).items():
+            self.register(key, module)
+
+    def register(self, key, module):
+        self._modules[key] = module
+
+    def scene_class(self, key):
+        cls = self._classes.get(key)
+        if cls is None:
+            with self.timer.measure(f"import {self._modules[key]}"):
+                cls = self._classes[key] = scene_class(self._modules[key], key.value)
+        return cls
+
+    def get(self, key):
+        scene = self._scenes.get(key)
+        if scene is None:
+            with self.timer.measure(f"construct {key.value}"):
+                start = perf_counter()
+                scene = self._scenes[key] = self.scene_class(key)()
+                self.construct_ms[key] = (perf_counter() - start) * 1000
+        return scene
+
+    def constructed(self, key):
+        return key in self._scenes
+
+    def discard(self, key):
+        """Drops a constructed scene, the next `get` constructs it again"""
+        return self._scenes.pop(key, None)
+
+    def resident(self):
+        """The keys of the constructed scenes"""
+        return list(self._scenes)
+
+    def prewarm(self, keys=None):
+        """Queues scenes (all registered by default) to construct ahead of time"""
+        for key in self._modules if keys is None else keys:
+            if key not in self._prewarm:
+                self._prewarm.append(key)
+
+    def prewarm_step(self):
+        """Constructs the next queued scene not constructed yet, returns its key"""
+        while self._prewarm:
+            key = self._prewarm.pop(0)
+            if not self.constructed(key):
+                self.get(key)
+                return key
+        return None
+
+    def __contains__(self, key):
+        return key in self._modules
+
+    def __iter__(self):
+        return iter(self._modules)
+
+
+class SceneManager:
+    """Switches between the scenes of a `SceneRegistry`, managing their lifecycle.
+
+    `switch(key)` suspends the active scene and enters (first time) or
+    resumes the selected one, see the hooks on `BaseScene`. Suspended scenes
+    stay resident so switching back is instant, but only the
+    `keep_suspended` most recently left ones: older ones are exited and
+    dropped, and spritesheets no scene holds any more are evicted. `pinned`
+    scenes (e.g. the title menu everything returns to) are never dropped. So
+    resident memory is bounded by the active scene and a few warm ones,
+    rather than by every scene visited. Prewarmed scenes (see
+    `SceneRegistry.prewarm`) stay resident until they are first visited,
+    outside of that count, and are then managed like any other.
+
+    The resident memory of a scene (see `utils.allocations.resident_memory`)
+    is measured every time it is left, and kept in `memory`.
+    """
+
+    def __init__(
+        self,
+        registry,
+        keep_suspended=1,
+        pinned=(),
+        spritesheets=SPRITESHEET_REGISTRY,
+    ):
+        self.registry = registry
+        self.keep_suspended = keep_suspended
+        self.pinned = set(pinned)
+        self.spritesheets = spritesheets
+        self.active = None
+        self.memory = {}
+        self._entered = set()
+        # unpinned resident scenes other than the active one, oldest first
+        self._suspended = []
+        # scenes constructed by prewarm_step and not entered yet
+        self._prewarmed = set()
+
+    @property
+    def scene(self):
+        return None if self.active is None else self.registry.get(self.active)
+
+    def switch(self, key):
+        """Makes `key` the active scene and returns it"""
+        if key == self.active:
+            return self.registry.get(key)
+        if self.active is not None:
+            previous = self.registry.get(self.active)
+            previous.suspend()
+            self.memory[self.active] = resident_memory(previous)
+            if self.active not in self.pinned:
+                self._suspended.append(self.active)
+            # hold no reference that would keep it alive when unloaded below
+            del previous
+
+        scene = self.registry.get(key)
+        if key in self._suspended:
+            self._suspended.remove(key)
+        self._prewarmed.discard(key)
+        if key in self._entered:
+            scene.resume()
+        else:
+            self._entered.add(key)
+            scene.enter()
+        self.active = key
+        self._unload_cold()
+        return scene
+
+    def unload(self, key):
+        """Exits and drops a resident scene that is not active"""
+        if key == self.active:
+            raise ValueError(f"Cannot unload the active scene {key.value}")
+        scene = self.registry.discard(key)
+        if key in self._suspended:
+            self._suspended.remove(key)
+        self._prewarmed.discard(key)
+        if scene is None:
+            return
+        scene.exit()
+        self._entered.discard(key)
+        self.memory.pop(key, None)
+        del scene
+        self.spritesheets.evict()
+
+    def _unload_cold(self):
+        while len(self._suspended) > self.keep_suspended:
+            self.unload(self._suspended[0])
+
+    def prewarm(self, keys=None):
+        self.registry.prewarm(keys)
+
+    def prewarm_step(self):
+        """Constructs the next prewarmed scene, returns its key"""
+        key = self.registry.prewarm_step()
+        if key is not None and key != self.active and key not in self.pinned:
+            self._prewarmed.add(key)
+        return key
+
+    def report(self):
+        """Resident memory by scene, measuring the active scene now"""
+        if self.active is not None:
+            self.memory[self.active] = resident_memory(self.scene)
+        return {
+            key.value: memory
+            for key, memory in self.memory.items()
+            if self.registry.constructed(key)
+        }
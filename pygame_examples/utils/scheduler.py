@@ -0,0 +1,38 @@
+import pygame
+
+
+class FrameScheduler:
+    """Paces the main loop for whichever scene is active.
+
+    Each frame is limited to the scene's `fps`. Scenes that set an
+    `idle_fps` drop to that rate once no events have arrived for
+    `idle_after` ms, and go back to `fps` as soon as input arrives. `tick`
+    returns the measured ms since the previous frame, which is handed to
+    the scene as `dt`.
+    """
+
+    def __init__(self, clock=None, idle_after=500):
+        self.clock = pygame.time.Clock() if clock is None else clock
+        self.idle_after = idle_after
+        self.idle = False
+        self._quiet_time = 0
+
+    def target_fps(self, scene):
+        if self.idle and scene.idle_fps is not None:
+            return scene.idle_fps
+        return scene.fps
+
+    def tick(self, scene, events=()):
+        """Waits out the rest of the frame and returns the measured dt in ms"""
+        if events:
+            # react to input at the full rate straight away
+            self._quiet_time = 0
+            self.idle = False
+        dt = self.clock.tick(self.target_fps(scene))
+        if not events:
+            self._quiet_time += dt
+            self.idle = self._quiet_time >= self.idle_after
+        return dt
+
+    def get_fps(self):
+        return self.clock.get_fps()
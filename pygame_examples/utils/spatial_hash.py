@@ -0,0 +1,67 @@
+from collections import defaultdict
+
+import pygame
+
+
+class SpatialHash:
+    """Uniform grid broadphase for rect collisions.
+
+    Items (e.g. indices into arrays, see `PotionField`) are bucketed into
+    every `cell_size` cell their rect overlaps. After an item moves, `update`
+    only touches the grid when the set of cells it overlaps has changed.
+    `candidates` returns the items in the cells a rect overlaps instead of
+    every item, for the caller to test exactly.
+    """
+
+    def __init__(self, cell_size):
+        if isinstance(cell_size, int):
+            cell_size = (cell_size, cell_size)
+        self.cell_size = cell_size
+        self._cells = defaultdict(set)
+        self._item_cells = {}
+
+    def _cells_for(self, rect):
+        cell_w, cell_h = self.cell_size
+        return tuple(
+            (x, y)
+            for x in range(rect.left // cell_w, (rect.right - 1) // cell_w + 1)
+            for y in range(rect.top // cell_h, (rect.bottom - 1) // cell_h + 1)
+        )
+
+    def insert(self, item, rect):
+        cells = self._cells_for(rect)
+        self._item_cells[item] = cells
+        for cell in cells:
+            self._cells[cell].add(item)
+
+    def update(self, item, rect):
+        """Re-buckets an item after its rect changed"""
+        cells = self._cells_for(rect)
+        if cells != self._item_cells.get(item):
+            self.remove(item)
+            self.insert(item, rect)
+
+    def remove(self, *items):
+        for item in items:
+            for cell in self._item_cells.pop(item, ()):
+                bucket = self._cells[cell]
+                bucket.discard(item)
+                if not bucket:
+                    del self._cells[cell]
+
+    def clear(self):
+        self._cells.clear()
+        self._item_cells.clear()
+
+    def candidates(self, rect):
+        """Returns the items sharing a cell with `rect`, which may not overlap it"""
+        candidates = set()
+        for cell in self._cells_for(pygame.Rect(rect)):
+            candidates.update(self._cells.get(cell, ()))
+        return candidates
+
+    def __contains__(self, item):
+        return item in self._item_cells
+
+    def __len__(self):
+        return len(self._item_cells)
@@ -1,26 +1,179 @@
+from collections import OrderedDict
 from typing import Tuple
 import pygame
+import weakref
 
 from pathlib import Path
 
+from utils.startup import STARTUP
+
 BASE_ASSET_PATH = Path(__file__).parent.parent.joinpath("assets")
+SHADOW_OFFSETS = ((1, 1), (0, 1), (1, 0), (2, 2))
+SHADOW_COLOR = (25, 25, 25)
 string_printable = """ !"#$%&'()*+,-./0123456789:;<=>?@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_`abcdefghijklmnopqrstuvwxyz{|}~"""
 
 
+def _resolve(filename):
+    """The path of an asset, relative names are looked up in the assets folder"""
+    path = Path(filename)
+    return path if path.is_absolute() else BASE_ASSET_PATH.joinpath(path)
+
+
+def _display_format():
+    display = pygame.display.get_surface()
+    if display is None:
+        return None
+    return (display.get_bitsize(), display.get_masks())
+
+
+class SpritesheetRegistry:
+    """Shares decoded spritesheets across all callers.
+
+    Each sheet is decoded and converted once per display format. Callers
+    `acquire` a sheet and `release` it when done; a released sheet stays
+    cached until `evict` is called so that respawning sprites stay cheap.
+    The shared surfaces must be treated as read-only. Filenames relative to
+    the assets folder, as passed to `SpritesheetUtils`, and absolute ones
+    name the same sheet. A sheet evicted while still held (`force`) is
+    decoded again by the next `acquire`, under a new key, so releases from
+    its old holders don't count against the new one.
+    """
+
+    def __init__(self):
+        self._sheets = {}
+        self._refcounts = {}
+        self._atlases = {}
+        # (path, display format) -> how many times it was evicted
+        self._generations = {}
+
+    def _key(self, filename):
+        sheet = (str(_resolve(filename)), _display_format())
+        return sheet + (self._generations.get(sheet, 0),)
+
+    def acquire(self, filename):
+        key = self._key(filename)
+        if key not in self._sheets:
+            with STARTUP.measure(f"decode {Path(filename).name}"):
+                self._sheets[key] = pygame.image.load(_resolve(filename)).convert()
+            self._refcounts[key] = 0
+        self._refcounts[key] += 1
+        return key, self._sheets[key]
+
+    def preload(self, filename):
+        """Decodes a sheet ahead of use, it stays cached until evicted"""
+        key, _ = self.acquire(filename)
+        self.release(key)
+        return key
+
+    def loaded(self, filename):
+        return self._key(filename) in self._sheets
+
+    def atlas(self, key, options, build):
+        """Returns the sliced tiles of a sheet, calling `build` only once"""
+        atlas_key = (key, options)
+        if atlas_key not in self._atlases:
+            self._atlases[atlas_key] = build()
+        return self._atlases[atlas_key]
+
+    def release(self, key):
+        # keys of evicted sheets are never reused, so late releases are no-ops
+        if key in self._refcounts:
+            self._refcounts[key] = max(self._refcounts[key] - 1, 0)
+
+    def refcount(self, filename):
+        return self._refcounts.get(self._key(filename), 0)
+
+    def evict(self, filename=None, *, force=False):
+        """Drops unreferenced sheets (or only `filename`), returns the count"""
+        path = None if filename is None else str(_resolve(filename))
+        keys = [key for key in self._sheets if path is None or key[0] == path]
+        evicted = 0
+        for key in keys:
+            if force or self._refcounts[key] == 0:
+                del self._sheets[key]
+                del self._refcounts[key]
+                self._generations[key[:2]] = key[2] + 1
+                for atlas_key in [x for x in self._atlases if x[0] == key]:
+                    del self._atlases[atlas_key]
+                evicted += 1
+        return evicted
+
+    def __len__(self):
+        return len(self._sheets)
+
+
+SPRITESHEET_REGISTRY = SpritesheetRegistry()
+
+
 class SpritesheetUtils:
-    def __init__(self, filename, *, with_basename=True, tile_size=16, colorkey=None):
+    def __init__(
+        self,
+        filename,
+        *,
+        with_basename=True,
+        tile_size=16,
+        colorkey=None,
+        atlas=False,
+        view=False,
+        registry=SPRITESHEET_REGISTRY,
+    ):
         if with_basename:
             filename = BASE_ASSET_PATH.joinpath(filename)
         try:
-            self.sheet = pygame.image.load(filename).convert()
+            self._registry_key, self.sheet = registry.acquire(filename)
         except Exception as e:
             print("Unable to load spritesheet image:", filename)
             raise Exception(e)
+        # release the shared sheet when this instance is garbage collected
+        self._release = weakref.finalize(self, registry.release, self._registry_key)
+        self._registry = registry
 
         self.tile_size = tile_size
         self.colorkey = colorkey
+        self.view = view
+
+        # atlas mode slices every tile once up front, shared between instances
+        self.tiles = None
+        if atlas:
+            self.tiles = registry.atlas(
+                self._registry_key, (tile_size, colorkey, view), self._build_atlas
+            )
+
+    def release(self):
+        """Returns the shared sheet to the registry, safe to call more than once"""
+        self._release()
+
+    def shared(self, options, build):
+        """Returns what `build` makes from this sheet, built once per `options`.
+
+        The result is shared by every instance using the sheet, until it is
+        evicted, e.g. frames of an animation (see `utils.animation`).
+        """
+        return self._registry.atlas(
+            self._registry_key, (options, self.colorkey, self.view), build
+        )
+
+    def _build_atlas(self):
+        tile_size = self.tile_size
+        if isinstance(tile_size, int):
+            tile_size = (tile_size, tile_size)
+        columns = self.sheet.get_width() // tile_size[0]
+        rows = self.sheet.get_height() // tile_size[1]
+        return {
+            (column, row): self._image_at_tile(
+                (column, row), colorkey=self.colorkey
+            )
+            for column in range(columns)
+            for row in range(rows)
+        }
 
     def image_at_tile(self, tile, colorkey=None):
+        """Returns the tile image, in atlas mode this is a shared read-only surface"""
+        if self.tiles is not None and (colorkey is None or colorkey == self.colorkey):
+            return self.tiles[tuple(tile)]
+        return self._image_at_tile(tile, colorkey=colorkey)
+
+    def _image_at_tile(self, tile, colorkey=None):
         row, column = tile
         tile_size = self.tile_size
         if isinstance(tile_size, int):
@@ -29,10 +182,25 @@ class SpritesheetUtils:
         image_at_rect = (x, y, tile_size[0], tile_size[1])
         return self.image_at(image_at_rect, colorkey=colorkey)
 
-    def image_at(self, rectangle, colorkey=None):
-        """Loads image from x,y,x+offset,y+offset"""
+    def image_at(self, rectangle, colorkey=None, view=None):
+        """Loads image from x,y,x+offset,y+offset
+
+        With `view` the image is a subsurface sharing the sheet's pixels, so
+        it must be treated as read-only. Views get their colorkey without
+        RLEACCEL, as run-length encoding needs a private copy of the pixels;
+        regions reaching outside the sheet fall back to a copy.
+        """
         colorkey = self.colorkey if colorkey is None else colorkey
+        view = self.view if view is None else view
         rect = pygame.Rect(rectangle)
+        if view and self.sheet.get_rect().contains(rect):
+            image = self.sheet.subsurface(rect)
+            if colorkey is not None:
+                if colorkey == -1:
+                    colorkey = image.get_at((0, 0))
+                image.set_colorkey(colorkey)
+            return image
+
         image = pygame.Surface(rect.size).convert()
         image.blit(self.sheet, (0, 0), rect)
         if colorkey is not None:
@@ -41,37 +209,64 @@ class SpritesheetUtils:
             image.set_colorkey(colorkey, pygame.RLEACCEL)
         return image
 
-    def images_at(self, rects, colorkey=None):
+    def images_at(self, rects, colorkey=None, view=None):
         """Loads multiple images, supply a list of coordinates"""
-        return [self.image_at(rect, colorkey) for rect in rects]
+        return [self.image_at(rect, colorkey, view) for rect in rects]
 
     def images_at_tiles(self, tiles, colorkey=None):
         """Loads multiple images, supply a list of coordinates"""
         return [self.image_at_tile(tile, colorkey) for tile in tiles]
 
-    def load_strip(self, rect, image_count, colorkey=None):
+    def load_strip(self, rect, image_count, colorkey=None, view=None):
         """Loads a strip of images and returns them as a list"""
         tups = [
             (rect[0] + rect[2] * x, rect[1], rect[2], rect[3])
             for x in range(image_count)
         ]
-        return self.images_at(tups, colorkey)
+        return self.images_at(tups, colorkey, view)
 
 
 class FontUtils:
-    def __init__(self):
+    def __init__(self, glyph_cache_size=512, text_cache_size=512):
         self.bitmap_size = (8, 16)
         self.ss = SpritesheetUtils(
             "bitmap_font/kenney-pixel.png",
             tile_size=self.bitmap_size,
             colorkey=(0, 0, 0),
+            atlas=True,
         )
         self.character_mapping = {v: idx for idx, v in enumerate(string_printable)}
+        # tinted glyphs keyed by (character, color), least recently used first
+        self.glyph_cache_size = glyph_cache_size
+        self._glyphs = OrderedDict()
+        # finished (shadowed and scaled) text surfaces for strings drawn every frame
+        self.text_cache_size = text_cache_size
+        self._text_surfaces = OrderedDict()
+        self.text_cache_hits = 0
+        self.text_cache_misses = 0
 
     def character_to_image(self, character):
         tile_index = self.character_mapping[character]
         return self.ss.image_at_tile((tile_index, 0))
 
+    def glyph(self, character, set_color: Tuple[int, int, int] | None = None):
+        """Returns a cached glyph already tinted with `set_color`"""
+        key = (character, None if set_color is None else tuple(set_color))
+        glyph = self._glyphs.get(key)
+        if glyph is not None:
+            self._glyphs.move_to_end(key)
+            return glyph
+
+        glyph = self.character_to_image(character)
+        if set_color is not None:
+            glyph = glyph.copy()
+            glyph.fill(set_color, special_flags=pygame.BLEND_RGB_MULT)
+            glyph.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+        self._glyphs[key] = glyph
+        if len(self._glyphs) > self.glyph_cache_size:
+            self._glyphs.popitem(last=False)
+        return glyph
+
     def text_to_image(self, text: str, set_color: Tuple[int, int, int] | None = None):
         image = pygame.Surface(
             (len(text) * self.bitmap_size[0], self.bitmap_size[1])
@@ -79,20 +274,15 @@ class FontUtils:
         image.set_colorkey((0, 0, 0))
 
         for i, character in enumerate(text):
-            image.blit(self.character_to_image(character), (i * self.bitmap_size[0], 0))
-
-        if set_color is not None:
-            color_image = pygame.Surface(image.get_size()).convert_alpha()
-            color_image.fill(set_color)
-            image.blit(color_image, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+            image.blit(self.glyph(character, set_color), (i * self.bitmap_size[0], 0))
         return image
 
     def text_to_image_shadow_effect(
         self,
         text,
         set_color=None,
-        offsets=[(1, 1), (0, 1), (1, 0), (2, 2)],
-        shadow_color=(25, 25, 25),
+        offsets=SHADOW_OFFSETS,
+        shadow_color=SHADOW_COLOR,
     ):
         max_x_offset = max([x[0] for x in offsets])
         max_y_offset = max([x[1] for x in offsets])
@@ -112,3 +302,34 @@ class FontUtils:
             image.blit(shadow, (offset[0], offset[0]))
         image.blit(display_text, (0, 0))
         return image
+
+    def text_surface(
+        self,
+        text,
+        set_color=None,
+        scale=1,
+        offsets=SHADOW_OFFSETS,
+        shadow_color=SHADOW_COLOR,
+    ):
+        """Memoized and scaled `text_to_image_shadow_effect`, treat as read-only"""
+        key = (
+            text,
+            None if set_color is None else tuple(set_color),
+            tuple(tuple(offset) for offset in offsets),
+            tuple(shadow_color),
+            scale,
+        )
+        image = self._text_surfaces.get(key)
+        if image is not None:
+            self.text_cache_hits += 1
+            self._text_surfaces.move_to_end(key)
+            return image
+
+        self.text_cache_misses += 1
+        image = self.text_to_image_shadow_effect(text, set_color, offsets, shadow_color)
+        if scale != 1:
+            image = pygame.transform.scale_by(image, scale)
+        self._text_surfaces[key] = image
+        if len(self._text_surfaces) > self.text_cache_size:
+            self._text_surfaces.popitem(last=False)
+        return image
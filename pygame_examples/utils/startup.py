@@ -0,0 +1,73 @@
+from contextlib import contextmanager
+from time import perf_counter
+
+
+class StartupTimer:
+    """Attributes the time until the first frame to the steps taken.
+
+    Like `FrameProfiler`, the startup is split into consecutive phases with
+    `lap(name)`, each taking the time since the previous lap. Work that can
+    happen within any phase, such as constructing a scene or decoding an
+    asset, is timed with `with measure(name):` and listed under the phase it
+    happened in, nested under any measure it happened within. `finish` ends
+    the last phase once the first frame is presented, after which nothing
+    more is recorded.
+
+    Time is counted from when this module is first imported, so it should be
+    imported before anything else worth timing.
+    """
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.finished = False
+        self.laps = []
+        # [lap index, depth, name, ms] in the order they started
+        self.measures = []
+        self._last = self.start
+        self._depth = 0
+
+    def lap(self, name):
+        if self.finished:
+            return
+        now = perf_counter()
+        self.laps.append((name, (now - self._last) * 1000))
+        self._last = now
+
+    @contextmanager
+    def measure(self, name):
+        if self.finished:
+            yield
+            return
+        entry = [len(self.laps), self._depth, name, None]
+        self.measures.append(entry)
+        self._depth += 1
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            entry[3] = (perf_counter() - start) * 1000
+            self._depth -= 1
+
+    def finish(self, name="first frame"):
+        self.lap(name)
+        self.finished = True
+
+    @property
+    def total_ms(self):
+        return sum(ms for _, ms in self.laps)
+
+    def report(self):
+        lines = [f"Startup: {self.total_ms:.1f}ms to first frame"]
+        for index, (name, ms) in enumerate(self.laps):
+            lines.append(f"  {name:<40}{ms:8.1f}ms")
+            for lap, depth, measure, measure_ms in self.measures:
+                if lap != index or measure_ms is None:
+                    continue
+                indent = "  " * (depth + 1)
+                lines.append(
+                    f"  {indent}{measure:<{40 - len(indent)}}{measure_ms:8.1f}ms"
+                )
+        return "\n".join(lines)
+
+
+STARTUP = StartupTimer()
@@ -0,0 +1,221 @@
+"""
+Frame pacing telemetry.
+
+`TelemetryRecorder` records the timings of every frame into a preallocated
+ring buffer, and streams them to a JSONL file a few lines at a time:
+
+    cd pygame_examples && python main.py --telemetry frames.jsonl
+
+Summarise a recording with a per scene frame time histogram:
+
+    cd pygame_examples && python -m utils.telemetry frames.jsonl
+"""
+
+import argparse
+import json
+import math
+from collections import defaultdict
+from time import perf_counter
+
+import numpy as np
+
+# profiler phases that make up each column, everything but `wait` is busy time
+SIM_PHASES = ("events", "input", "update", "collide")
+DRAW_PHASES = ("draw", "hud", "overlay")
+PRESENT_PHASES = ("present",)
+
+FRAME_DTYPE = np.dtype(
+    [
+        ("frame", np.int64),
+        ("time_ms", np.float64),
+        ("scene", np.int16),
+        ("dt_ms", np.float32),
+        ("sim_ms", np.float32),
+        ("draw_ms", np.float32),
+        ("present_ms", np.float32),
+        ("busy_ms", np.float32),
+        ("budget_ms", np.float32),
+    ]
+)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class TelemetryRecorder:
+    """Streams per frame timings to a JSONL file.
+
+    `record` only writes into a preallocated ring buffer of `capacity`
+    frames, so recording allocates nothing per frame. Every `flush_every`
+    frames the oldest recorded frames are written out, so the file grows
+    steadily instead of stalling a frame to write the whole buffer. If
+    writing falls behind by a full buffer the oldest frames are dropped, and
+    counted in `dropped`.
+
+    Every line holds the frame's dt, the time spent simulating, drawing and
+    presenting, the total busy time and the frame budget of the scene. Frames
+    whose busy time is over budget are flagged `over_budget`, and frames that
+    took more than `jank_factor` budgets to arrive (a visibly dropped frame)
+    are flagged `jank`.
+    """
+
+    def __init__(self, path, capacity=1024, flush_every=16, jank_factor=1.5):
+        self.path = path
+        self.capacity = capacity
+        self.flush_every = flush_every
+        self.jank_factor = jank_factor
+        self.frames = 0
+        self.dropped = 0
+        self._buffer = np.zeros(capacity, dtype=FRAME_DTYPE)
+        # frames recorded but not yet written are _buffer[_head:_head + _size]
+        self._head = 0
+        self._size = 0
+        self._scenes = {}
+        self._scene_names = []
+        self._start = perf_counter()
+        self._file = open(path, "w")
+
+    def scene_id(self, name):
+        if name not in self._scenes:
+            self._scenes[name] = len(self._scene_names)
+            self._scene_names.append(name)
+        return self._scenes[name]
+
+    def record(self, scene, dt, phases, budget_ms):
+        """Records a frame from the profiler's `phases` of that frame"""
+        if self._size == self.capacity:
+            self._head = (self._head + 1) % self.capacity
+            self._size -= 1
+            self.dropped += 1
+        row = self._buffer[(self._head + self._size) % self.capacity]
+        sim = draw = present = busy = 0.0
+        for name, ms in phases.items():
+            if name in SIM_PHASES:
+                sim += ms
+            elif name in DRAW_PHASES:
+                draw += ms
+            elif name in PRESENT_PHASES:
+                present += ms
+            if name != "wait":
+                busy += ms
+        row["frame"] = self.frames
+        row["time_ms"] = (perf_counter() - self._start) * 1000
+        row["scene"] = self.scene_id(scene)
+        row["dt_ms"] = dt
+        row["sim_ms"] = sim
+        row["draw_ms"] = draw
+        row["present_ms"] = present
+        row["busy_ms"] = busy
+        row["budget_ms"] = budget_ms
+        self._size += 1
+        self.frames += 1
+        if self._size >= self.flush_every:
+            self.flush(self.flush_every)
+
+    def _line(self, row):
+        budget = float(row["budget_ms"])
+        return json.dumps(
+            {
+                "frame": int(row["frame"]),
+                "time_ms": round(float(row["time_ms"]), 3),
+                "scene": self._scene_names[row["scene"]],
+                "dt_ms": round(float(row["dt_ms"]), 3),
+                "sim_ms": round(float(row["sim_ms"]), 3),
+                "draw_ms": round(float(row["draw_ms"]), 3),
+                "present_ms": round(float(row["present_ms"]), 3),
+                "busy_ms": round(float(row["busy_ms"]), 3),
+                "budget_ms": round(budget, 3),
+                "over_budget": bool(row["busy_ms"] > budget),
+                "jank": bool(row["dt_ms"] > budget * self.jank_factor),
+            }
+        )
+
+    def flush(self, count=None):
+        """Writes out the `count` oldest recorded frames, or all of them"""
+        count = self._size if count is None else min(count, self._size)
+        lines = [
+            self._line(self._buffer[(self._head + index) % self.capacity])
+            for index in range(count)
+        ]
+        if lines:
+            self._file.write("\n".join(lines) + "\n")
+        self._head = (self._head + count) % self.capacity
+        self._size -= count
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+
+def load(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def histogram(values, bucket_ms, buckets):
+    """Counts values into `buckets` buckets of `bucket_ms`, the last is open"""
+    counts = [0] * buckets
+    for value in values:
+        counts[min(int(value // bucket_ms), buckets - 1)] += 1
+    return counts
+
+
+def summarise(frames, field="dt_ms", bucket_ms=4, buckets=10, width=40):
+    by_scene = defaultdict(list)
+    for frame in frames:
+        by_scene[frame["scene"]].append(frame)
+
+    lines = []
+    for scene, scene_frames in by_scene.items():
+        values = [frame[field] for frame in scene_frames]
+        over_budget = sum(frame["over_budget"] for frame in scene_frames)
+        jank = sum(frame["jank"] for frame in scene_frames)
+        lines.append(
+            f"{scene}: {len(scene_frames)} frames, "
+            f"{over_budget} over budget, {jank} janky"
+        )
+        lines.append(
+            f"  {field} mean {sum(values) / len(values):.2f}"
+            f" p50 {percentile(values, 50):.2f}"
+            f" p95 {percentile(values, 95):.2f}"
+            f" p99 {percentile(values, 99):.2f}"
+            f" max {max(values):.2f}"
+        )
+        counts = histogram(values, bucket_ms, buckets)
+        most = max(counts)
+        for index, count in enumerate(counts):
+            low = index * bucket_ms
+            label = (
+                f"{low:>3g}+    ms"
+                if index == buckets - 1
+                else f"{low:>3g}-{low + bucket_ms:<3g}ms"
+            )
+            bar = "#" * math.ceil(count / most * width) if count else ""
+            lines.append(f"  {label} {count:>7} {bar}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Prints per scene frame time histograms of a telemetry file"
+    )
+    parser.add_argument("path", help="JSONL file written by TelemetryRecorder")
+    parser.add_argument(
+        "--field",
+        default="dt_ms",
+        choices=["dt_ms", "sim_ms", "draw_ms", "present_ms", "busy_ms"],
+    )
+    parser.add_argument("--bucket-ms", type=float, default=4)
+    parser.add_argument("--buckets", type=int, default=10)
+    args = parser.parse_args(argv)
+    print(summarise(load(args.path), args.field, args.bucket_ms, args.buckets))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import heapq
+import itertools
+
+
+class Timer:
+    """A deadline in a `TimerQueue`, `active` until it fires or is cancelled"""
+
+    __slots__ = ("deadline", "callback", "args", "active")
+
+    def __init__(self, deadline, callback, args):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.active = True
+
+    def cancel(self):
+        self.active = False
+
+
+class TimerQueue:
+    """Fires callbacks once their deadline passes.
+
+    Deadlines are kept in a heap, so `run` only looks at the timers that are
+    due: a step costs O(expired * log n) however many timers are waiting,
+    rather than every cooldown and animation comparing its own deadline every
+    frame. Cancelled timers stay in the heap until they come due and are
+    dropped then.
+
+    Times are the scene's simulated ms (see `BaseScene.time`). `BaseScene`
+    calls `run(now)` before every simulation step, and `after` counts from
+    the `now` of the last run. A timer without a callback is a cooldown:
+    it is `active` until its deadline passes.
+    """
+
+    def __init__(self, now=0):
+        self.now = now
+        self._heap = []
+        # breaks ties between equal deadlines in the order they were scheduled
+        self._order = itertools.count()
+
+    def at(self, deadline, callback=None, *args):
+        timer = Timer(deadline, callback, args)
+        heapq.heappush(self._heap, (deadline, next(self._order), timer))
+        return timer
+
+    def after(self, delay, callback=None, *args):
+        return self.at(self.now + delay, callback, *args)
+
+    @staticmethod
+    def active(timer):
+        """Whether `timer`, which may be None, is still waiting"""
+        return timer is not None and timer.active
+
+    def remaining(self, timer):
+        """ms until `timer` fires, 0 once it fired or was cancelled"""
+        if not self.active(timer):
+            return 0
+        return max(timer.deadline - self.now, 0)
+
+    def run(self, now):
+        """Fires the timers due by `now` in deadline order, returns how many"""
+        self.now = now
+        heap = self._heap
+        fired = 0
+        while heap and heap[0][0] <= now:
+            timer = heapq.heappop(heap)[2]
+            if not timer.active:
+                continue
+            timer.active = False
+            fired += 1
+            if timer.callback is not None:
+                timer.callback(*timer.args)
+        return fired
+
+    def clear(self):
+        """Cancels every timer"""
+        for _, _, timer in self._heap:
+            timer.active = False
+        self._heap.clear()
+
+    def __len__(self):
+        return len(self._heap)
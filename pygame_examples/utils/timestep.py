@@ -0,0 +1,93 @@
+import pygame
+
+
+def lerp(previous, current, alpha):
+    return previous + (current - previous) * alpha
+
+
+class FixedTimestep:
+    """Turns variable frame times into a whole number of fixed steps.
+
+    Each frame's dt is added to an accumulator, and `advance` returns how
+    many `step_ms` steps it holds; the remainder carries over to the next
+    frame. So the simulation advances the same way however fast frames are
+    drawn. `alpha` is how far the next step has come, for drawing positions
+    interpolated between the last two steps. At most `max_steps` run per
+    frame, after a longer hitch the rest of the backlog is dropped instead of
+    making the next frame longer still.
+    """
+
+    def __init__(self, step_ms, max_steps=5):
+        self.step_ms = step_ms
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+
+    def advance(self, dt):
+        self.accumulator += dt
+        steps = int(self.accumulator // self.step_ms)
+        if steps > self.max_steps:
+            steps = self.max_steps
+            self.accumulator %= self.step_ms
+        else:
+            self.accumulator -= steps * self.step_ms
+        return steps
+
+    @property
+    def alpha(self):
+        return self.accumulator / self.step_ms
+
+    def reset(self):
+        self.accumulator = 0.0
+
+
+class InterpolatedSprite(pygame.sprite.Sprite):
+    """A sprite drawn between its positions before and after the last step.
+
+    The simulation moves `rect` as usual. `snapshot` is called before every
+    fixed step (see `BaseScene.render`), and `BatchedRenderUpdates.draw`
+    draws the sprite at `drawn_rect(alpha)`: its current rect, with the
+    center moved back towards where it was.
+    """
+
+    previous_center = None
+    # where `move` has taken the rect's top left, with the sub-pixel part
+    position = None
+
+    def move(self, x, y, bounds=None):
+        """Moves `rect` by a fraction of a pixel, keeping it within `bounds`.
+
+        The fractions add up over steps instead of being rounded away, which
+        matters for slow sprites drawn at a large `BaseScene.pixel_scale`.
+        """
+        if self.position is None or (
+            round(self.position[0]),
+            round(self.position[1]),
+        ) != self.rect.topleft:
+            # the rect was moved by other means
+            self.position = self.rect.topleft
+        left, top = self.position[0] + x, self.position[1] + y
+        if bounds is not None:
+            left = min(max(left, bounds[0]), bounds[0] + bounds[2] - self.rect.w)
+            top = min(max(top, bounds[1]), bounds[1] + bounds[3] - self.rect.h)
+        self.position = (left, top)
+        self.rect.topleft = (round(left), round(top))
+
+    def snapshot(self):
+        self.previous_center = self.rect.center
+
+    def drawn_rect(self, alpha):
+        if self.previous_center is None:
+            return self.rect
+        rect = self.rect.copy()
+        rect.center = (
+            round(lerp(self.previous_center[0], rect.centerx, alpha)),
+            round(lerp(self.previous_center[1], rect.centery, alpha)),
+        )
+        return rect
+
+
+def drawn_rect(sprite, alpha):
+    """Where to draw a sprite, interpolated if it supports it"""
+    if alpha is None or not isinstance(sprite, InterpolatedSprite):
+        return sprite.rect
+    return sprite.drawn_rect(alpha)
@@ -0,0 +1,150 @@
+from enum import Enum
+
+import numpy as np
+
+
+class Easing(Enum):
+    LINEAR = 0
+    IN_QUAD = 1
+    OUT_QUAD = 2
+    IN_OUT_QUAD = 3
+    OUT_CUBIC = 4
+    IN_OUT_SINE = 5
+
+
+def _in_out_quad(t):
+    return np.where(t < 0.5, 2 * t * t, 1 - (2 - 2 * t) ** 2 / 2)
+
+
+# curves mapping progress in [0, 1] onto [0, 1], over whole arrays at once
+CURVES = {
+    Easing.LINEAR: lambda t: t,
+    Easing.IN_QUAD: lambda t: t * t,
+    Easing.OUT_QUAD: lambda t: 1 - (1 - t) ** 2,
+    Easing.IN_OUT_QUAD: _in_out_quad,
+    Easing.OUT_CUBIC: lambda t: 1 - (1 - t) ** 3,
+    Easing.IN_OUT_SINE: lambda t: (1 - np.cos(np.pi * t)) / 2,
+}
+
+
+class Tweens:
+    """Every tween of a scene, advanced together as arrays.
+
+    A tween moves a value from `start` to `end` over `duration` ms along an
+    easing curve. Like `PotionField`, tweens are stored as arrays rather than
+    objects, so a step advances all of them with a few vectorized operations
+    per easing curve in use, however many there are. Tweens are referenced by
+    the index `add` returns, and sprites read `value(index)` in their
+    `update`. A finished tween holds its end value until it is played again,
+    a `repeat` tween starts over instead. Indices of removed tweens are
+    reused.
+
+    Times are the scene's simulated ms (see `BaseScene.time`). `BaseScene`
+    calls `update(now)` before every simulation step; tweens played before
+    the first update start with it, later ones from the `now` of the last
+    update.
+    """
+
+    def __init__(self, capacity=16):
+        self.now = None
+        self.start = np.zeros(capacity)
+        self.end = np.zeros(capacity)
+        self.duration = np.ones(capacity)
+        # NaN until the first update after being played
+        self.started = np.full(capacity, np.nan)
+        self.easing = np.zeros(capacity, dtype=np.int8)
+        self.repeat = np.zeros(capacity, dtype=bool)
+        self.playing = np.zeros(capacity, dtype=bool)
+        self.values = np.zeros(capacity)
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def _grow(self):
+        capacity = len(self.values)
+        for name, fill in (
+            ("start", 0),
+            ("end", 0),
+            ("duration", 1),
+            ("started", np.nan),
+            ("easing", 0),
+            ("repeat", False),
+            ("playing", False),
+            ("values", 0),
+        ):
+            array = getattr(self, name)
+            setattr(
+                self, name, np.concatenate([array, np.full(capacity, fill, array.dtype)])
+            )
+        self._free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def add(
+        self,
+        start=0.0,
+        end=0.0,
+        duration=1.0,
+        easing=Easing.LINEAR,
+        repeat=False,
+        play=True,
+    ):
+        if not self._free:
+            self._grow()
+        index = self._free.pop()
+        self.easing[index] = easing.value
+        self.repeat[index] = repeat
+        self.duration[index] = duration
+        self.start[index] = self.values[index] = start
+        self.end[index] = end
+        if play:
+            self.play(index)
+        return index
+
+    def play(self, index, start=None, end=None, duration=None):
+        """(Re)starts a tween, optionally between new values or for a new time"""
+        if start is not None:
+            self.start[index] = start
+        if end is not None:
+            self.end[index] = end
+        if duration is not None:
+            self.duration[index] = duration
+        self.values[index] = self.start[index]
+        self.started[index] = np.nan if self.now is None else self.now
+        self.playing[index] = True
+
+    def value(self, index):
+        return float(self.values[index])
+
+    def active(self, index):
+        return bool(self.playing[index])
+
+    def remove(self, index):
+        self.playing[index] = False
+        self._free.append(index)
+
+    def update(self, now):
+        self.now = now
+        active = np.flatnonzero(self.playing)
+        if not active.size:
+            return
+        started = self.started[active]
+        pending = np.isnan(started)
+        started[pending] = now
+        self.started[active[pending]] = now
+
+        progress = (now - started) / self.duration[active]
+        repeat = self.repeat[active]
+        progress = np.where(repeat, progress % 1, np.minimum(progress, 1))
+        self.playing[active[~repeat & (progress >= 1)]] = False
+
+        easing = self.easing[active]
+        for code in np.unique(easing).tolist():
+            if code != Easing.LINEAR.value:
+                eased = easing == code
+                progress[eased] = CURVES[Easing(code)](progress[eased])
+        start = self.start[active]
+        self.values[active] = start + (self.end[active] - start) * progress
+
+    def clear(self):
+        self.playing[:] = False
+        self._free = list(range(len(self.values) - 1, -1, -1))
+
+    def __len__(self):
+        return len(self.values) - len(self._free)